@@ -1,53 +1,312 @@
 from __future__ import annotations
 
+from collections import OrderedDict
+from itertools import islice
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import gzip
+import hashlib
+import json
+import math
+import mimetypes
 import os
+import queue
+import random
+import threading
+import time
 import uuid
+import zlib
 
-from flask import Flask, redirect, render_template, request, session, url_for
+from flask import (
+    Flask,
+    Response,
+    abort,
+    g,
+    make_response,
+    redirect,
+    render_template,
+    request,
+    send_from_directory,
+    session,
+    url_for,
+)
+from markupsafe import Markup
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from werkzeug.middleware.proxy_fix import ProxyFix
 
-from webtorkel import DB_URL, DataStore, GameEngine, PlayerStatus, RollOutcome
+from assets import ASSET_MAX_AGE, PRECOMPRESSED, Asset, AssetManifest, brotli
+from broadcast import ALL, Broadcaster
+from hibernate import HibernationStore
+from leaderboard import RANKINGS, Leaderboard, LeaderboardEntry, ResultWriter, day_of
+from metrics import Registry, deep_sizeof
+from packs import DEFAULT_PACK, ContentPack, ContentRegistry, parse_packs
+from ratelimit import RateLimiter
+from tracing import NULL_STAGE, Trace, TraceSink
+from webtorkel import (
+    DB_URL,
+    DataStore,
+    FinishedGame,
+    GameEngine,
+    GameLog,
+    PlayerStatus,
+    RollOutcome,
+    TableView,
+    pack_outcome,
+    unpack_outcome,
+)
 
 APP_ROOT = Path(__file__).resolve().parent
-IMAGE_DIR = APP_ROOT / "static" / "images"
+STATIC_DIR = APP_ROOT / "static"
 
-AVAILABLE_IMAGES = {
-    int(path.stem)
-    for path in IMAGE_DIR.glob("*.jpg")
-    if path.stem.isdigit()
-}
+ASSETS = AssetManifest(STATIC_DIR)
+
+MAX_ROLLS_PER_REQUEST = int(os.environ.get("WEBTORKEL_MAX_ROLLS", "500"))
+FRAGMENT_CACHE_SIZE = int(os.environ.get("WEBTORKEL_FRAGMENT_CACHE", "512"))
+LOG_MEMORY_ROLLS = int(os.environ.get("WEBTORKEL_LOG_MEMORY_ROLLS", "4096"))
+LOG_SPILL_DIR = os.environ.get("WEBTORKEL_LOG_SPILL_DIR") or None
+LOG_PAGE_LINES = 500
+LOG_CHUNK_SIZE = 16 * 1024
+PRELOAD_IMAGES = int(os.environ.get("WEBTORKEL_PRELOAD_IMAGES", "3"))
+PRELOAD_MIN_CHANCE = 0.05
+CONTENT_WAIT_SECONDS = float(os.environ.get("WEBTORKEL_CONTENT_WAIT", "10"))
+ENGINE_POOL_SIZE = int(os.environ.get("WEBTORKEL_ENGINE_POOL", "32"))
+CONTENT_RETRY_MIN_SECONDS = 1.0
+CONTENT_RETRY_MAX_SECONDS = 60.0
+COMPRESS_MIN_SIZE = int(os.environ.get("WEBTORKEL_COMPRESS_MIN_SIZE", "1024"))
+COMPRESS_MIMETYPES = {"text/html", "text/plain", "application/json"}
+HIBERNATE_AFTER_SECONDS = float(os.environ.get("WEBTORKEL_HIBERNATE_AFTER", "900"))
+HIBERNATE_TTL_SECONDS = float(os.environ.get("WEBTORKEL_HIBERNATE_TTL", str(7 * 24 * 60 * 60)))
+HIBERNATE_DIR = os.environ.get("WEBTORKEL_HIBERNATE_DIR") or None
+STATELESS = os.environ.get("WEBTORKEL_STATELESS", "") not in ("", "0")
+NAME_MAX_LENGTH = 40
+LEADERBOARD_SIZE = int(os.environ.get("WEBTORKEL_LEADERBOARD_SIZE", "10"))
+LEADERBOARD_DAYS = 7
+RESULT_BATCH_SIZE = int(os.environ.get("WEBTORKEL_RESULT_BATCH", "200"))
+RESULT_FLUSH_SECONDS = float(os.environ.get("WEBTORKEL_RESULT_FLUSH", "1"))
+FEED_BUFFER_EVENTS = int(os.environ.get("WEBTORKEL_FEED_BUFFER", "256"))
+FEED_MAX_SUBSCRIBERS = int(os.environ.get("WEBTORKEL_FEED_MAX_SUBSCRIBERS", "5000"))
+ROLL_RATE = float(os.environ.get("WEBTORKEL_ROLL_RATE", "5"))
+ADDRESS_RATE = float(os.environ.get("WEBTORKEL_ADDRESS_RATE", "50"))
+NEW_GAME_RATE = float(os.environ.get("WEBTORKEL_NEW_GAME_RATE", "50"))
+ADDRESS_NEW_GAME_RATE = float(os.environ.get("WEBTORKEL_ADDRESS_NEW_GAME_RATE", "0.5"))
+MAX_GAMES = int(os.environ.get("WEBTORKEL_MAX_GAMES", "2000"))
+MAX_INFLIGHT = int(os.environ.get("WEBTORKEL_MAX_INFLIGHT", "64"))
+PROXY_HOPS = int(os.environ.get("WEBTORKEL_PROXY_HOPS", "0"))
+SERVER_TIMING = os.environ.get("WEBTORKEL_SERVER_TIMING", "0") not in ("", "0")
+TRACE_PATH = os.environ.get("WEBTORKEL_TRACE_PATH") or None
+TRACE_SAMPLE = float(os.environ.get("WEBTORKEL_TRACE_SAMPLE", "0.01"))
+# Extra content packs as "name=url,..."; the "default" pack is WEBTORKEL_DB_URL.
+CONTENT_PACKS = parse_packs(os.environ.get("WEBTORKEL_PACKS", ""), DB_URL)
+# Cheap or long-lived endpoints that admission control leaves alone.
+ADMISSION_EXEMPT = {"healthz", "readyz", "metrics", "asset", "static", "feed"}
 
 BASE_DATA: Optional[DataStore] = None
+PACKS: Optional[ContentRegistry] = None
 DATA_ERROR: Optional[str] = None
 DB_SESSION = None
+CONTENT_LOAD_SECONDS = 0.0
+GAME_MEMORY_ESTIMATE = 0
+CONTENT_READY = threading.Event()
+CONTENT_LOADER: Optional[threading.Thread] = None
+CONTENT_LOADER_LOCK = threading.Lock()
+
+ENGINE_POOL: "queue.Queue[GameEngine]" = queue.Queue(maxsize=max(ENGINE_POOL_SIZE, 1))
+ENGINE_POOL_REFILL = threading.Event()
 
 GAMES: Dict[str, GameEngine] = {}
 LAST_OUTCOME: Dict[str, RollOutcome] = {}
-GAME_LOGS: Dict[str, List[str]] = {}
-LAST_STATUS: Dict[str, PlayerStatus] = {}
-GAME_OVER_LOGGED: set[str] = set()
+GAME_LOGS: Dict[str, GameLog] = {}
+LAST_SEEN: Dict[str, float] = {}
+GAMES_LOCK = threading.Lock()
+HIBERNATED = HibernationStore(HIBERNATE_DIR)
+# Games being written to or read from HIBERNATED. The disk I/O runs without
+# GAMES_LOCK; requests for a game in transit wait for its event.
+IN_TRANSIT: Dict[str, threading.Event] = {}
 
+LEADERBOARD = Leaderboard(LEADERBOARD_SIZE, LEADERBOARD_DAYS)
+RESULT_WRITER: Optional[ResultWriter] = None
 
-def load_base_data() -> Optional[DataStore]:
-    global BASE_DATA, DATA_ERROR, DB_SESSION
-    if BASE_DATA is not None or DATA_ERROR is not None:
-        return BASE_DATA
+FEED = Broadcaster(FEED_BUFFER_EVENTS, FEED_MAX_SUBSCRIBERS)
+
+ROLL_LIMIT = RateLimiter(ROLL_RATE, ROLL_RATE * 4)
+ADDRESS_LIMIT = RateLimiter(ADDRESS_RATE, ADDRESS_RATE * 2)
+NEW_GAME_LIMIT = RateLimiter(NEW_GAME_RATE, NEW_GAME_RATE * 2)
+ADDRESS_NEW_GAME_LIMIT = RateLimiter(ADDRESS_NEW_GAME_RATE, 10)
+INFLIGHT = threading.BoundedSemaphore(MAX_INFLIGHT) if MAX_INFLIGHT > 0 else None
+
+TRACE_SINK = TraceSink(TRACE_PATH) if TRACE_PATH and TRACE_SAMPLE > 0 else None
+
+TABLE_FRAGMENTS: "OrderedDict[Tuple[str, int, int], Markup]" = OrderedDict()
+FRAGMENT_LOCK = threading.Lock()
+
+# Stateless games already on the leaderboard, by nonce and dice seed: the dice
+# replay exactly, so a resent cookie would otherwise finish the game again.
+FINISHED_STATELESS: "OrderedDict[Tuple[int, int], None]" = OrderedDict()
+FINISHED_STATELESS_LIMIT = 4096
+FINISHED_LOCK = threading.Lock()
+
+PREFETCHED: Dict[str, set[int]] = {}
+
+METRICS = Registry()
+METRICS.describe("webtorkel_games_created_total", "counter", "Games created for new sessions.")
+METRICS.describe("webtorkel_games_reset_total", "counter", "Games restarted through /reset.")
+METRICS.describe("webtorkel_games_finished_total", "counter", "Games that reached game over.")
+METRICS.describe("webtorkel_rolls_total", "counter", "Dice rolls played.")
+METRICS.describe("webtorkel_evictions_total", "counter", "Entries evicted from bounded caches.")
+METRICS.describe("webtorkel_request_duration_seconds", "histogram", "Request latency by route.")
+METRICS.describe("webtorkel_content_load_failures_total", "counter", "Failed content load attempts.")
+METRICS.describe("webtorkel_template_failures_total", "counter", "Templates that failed to compile at startup.")
+METRICS.describe("webtorkel_engine_pool_hits_total", "counter", "Games taken from the warm engine pool.")
+METRICS.describe("webtorkel_engine_pool_misses_total", "counter", "Games built on the request path.")
+METRICS.describe("webtorkel_leaderboard_load_failures_total", "counter", "Failed leaderboard setups.")
+METRICS.describe("webtorkel_rejected_total", "counter", "Requests refused by rate limits or load shedding.")
+METRICS.describe("webtorkel_rehydrate_seconds", "histogram", "Time to bring a hibernated game back into memory.")
+METRICS.describe("webtorkel_not_modified_total", "counter", "Game pages answered with 304 Not Modified.")
+METRICS.describe("webtorkel_cache_lookups_total", "counter", "Fragment cache lookups and image prefetch hints.")
+
+
+def _load_content() -> None:
+    global BASE_DATA, PACKS, DATA_ERROR, DB_SESSION, CONTENT_LOAD_SECONDS, GAME_MEMORY_ESTIMATE
+    start = time.perf_counter()
+    engine = create_engine(DB_URL, future=True, pool_pre_ping=True)
+    DB_SESSION = sessionmaker(bind=engine, future=True)
+    packs = ContentRegistry()
+    for name, url in CONTENT_PACKS.items():
+        if url == DB_URL:
+            pack_session = DB_SESSION
+        else:
+            pack_session = sessionmaker(bind=create_engine(url, future=True, pool_pre_ping=True), future=True)
+        with pack_session() as session:
+            packs.load(name, session)
+    CONTENT_LOAD_SECONDS = time.perf_counter() - start
+    default = packs.get(DEFAULT_PACK)
+    data = default.data
+    if STATELESS:
+        GAME_MEMORY_ESTIMATE = 0
+    else:
+        # Clones share content with the pack until they change it.
+        GAME_MEMORY_ESTIMATE = deep_sizeof(GameEngine(data.clone()), shared=data)
+    PACKS = packs
+    BASE_DATA = data
+    DATA_ERROR = None
 
+
+def _warm_up(app: Flask) -> None:
+    # A template that fails here fails again when a request renders it; the
+    # loader carries on so the content still loads.
+    global DATA_ERROR
+    for name in app.jinja_env.list_templates():
+        try:
+            app.jinja_env.get_template(name)
+        except Exception as exc:
+            DATA_ERROR = f"template {name}: {exc}"
+            METRICS.inc("webtorkel_template_failures_total")
+
+
+def _load_content_with_retry(app: Optional[Flask]) -> None:
+    global DATA_ERROR
+    if app is not None:
+        _warm_up(app)
+    delay = CONTENT_RETRY_MIN_SECONDS
+    while True:
+        try:
+            _load_content()
+        except Exception as exc:
+            DATA_ERROR = str(exc)
+            METRICS.inc("webtorkel_content_load_failures_total")
+            time.sleep(delay)
+            delay = min(delay * 2, CONTENT_RETRY_MAX_SECONDS)
+            continue
+        CONTENT_READY.set()
+        _start_engine_pool()
+        _start_leaderboard()
+        return
+
+
+def _start_leaderboard() -> None:
+    global RESULT_WRITER
+    # Finished games are still ranked in memory if the table cannot be read.
     try:
-        engine = create_engine(DB_URL, future=True, pool_pre_ping=True)
-        DB_SESSION = sessionmaker(bind=engine, future=True)
+        FinishedGame.__table__.create(DB_SESSION.kw["bind"], checkfirst=True)
         with DB_SESSION() as session:
-            BASE_DATA = DataStore(session)
-    except Exception as exc:
-        DATA_ERROR = str(exc)
-        BASE_DATA = None
+            LEADERBOARD.load(session)
+    except Exception:
+        METRICS.inc("webtorkel_leaderboard_load_failures_total")
+    RESULT_WRITER = ResultWriter(DB_SESSION, RESULT_BATCH_SIZE, RESULT_FLUSH_SECONDS)
+    RESULT_WRITER.start()
+
+
+def _start_engine_pool() -> None:
+    if ENGINE_POOL_SIZE <= 0 or STATELESS:
+        return
+    ENGINE_POOL_REFILL.set()
+    threading.Thread(target=_refill_engine_pool, name="webtorkel-engine-pool", daemon=True).start()
+
+
+def _refill_engine_pool() -> None:
+    while True:
+        ENGINE_POOL_REFILL.wait()
+        ENGINE_POOL_REFILL.clear()
+        data = BASE_DATA
+        while data is not None and not ENGINE_POOL.full():
+            ENGINE_POOL.put(GameEngine(data.clone()))
 
+
+def _take_engine(data: DataStore) -> GameEngine:
+    if ENGINE_POOL_SIZE > 0:
+        ENGINE_POOL_REFILL.set()
+        try:
+            game = ENGINE_POOL.get_nowait()
+        except queue.Empty:
+            game = None
+        if game is not None and game.data.version == data.version and game.data.pack == data.pack:
+            METRICS.inc("webtorkel_engine_pool_hits_total")
+            return game
+    METRICS.inc("webtorkel_engine_pool_misses_total")
+    return GameEngine(data.clone())
+
+
+def start_content_loader(app: Optional[Flask] = None) -> None:
+    global CONTENT_LOADER
+    with CONTENT_LOADER_LOCK:
+        if CONTENT_LOADER is not None or CONTENT_READY.is_set():
+            return
+        CONTENT_LOADER = threading.Thread(
+            target=_load_content_with_retry,
+            args=(app,),
+            name="webtorkel-content-loader",
+            daemon=True,
+        )
+        CONTENT_LOADER.start()
+
+
+def load_base_data() -> Optional[DataStore]:
+    if BASE_DATA is not None:
+        return BASE_DATA
+    start_content_loader()
+    # Once an attempt has failed, answer with the error instead of waiting on retries.
+    if DATA_ERROR is None:
+        CONTENT_READY.wait(CONTENT_WAIT_SECONDS)
     return BASE_DATA
 
 
+def data_error() -> str:
+    return DATA_ERROR or "Content is still loading, try again shortly."
+
+
+def content_pack(name: Optional[str]) -> ContentPack:
+    """The loaded pack called ``name``, or the default pack."""
+    return PACKS.get(name) or PACKS.get(DEFAULT_PACK)
+
+
+def requested_pack() -> ContentPack:
+    # A new game uses ?pack= (or the reset form's field), else the session's last pack.
+    pack = content_pack(request.values.get("pack") or session.get("pack"))
+    session["pack"] = pack.name
+    return pack
+
+
 def get_game_id() -> str:
     game_id = session.get("game_id")
     if not game_id:
@@ -57,72 +316,736 @@ def get_game_id() -> str:
 
 
 def get_game() -> Optional[GameEngine]:
-    data = load_base_data()
-    if data is None:
+    with trace_stage("game"):
+        if load_base_data() is None:
+            return None
+
+        if STATELESS:
+            game_id = ""
+            game = _cookie_game()
+        else:
+            game_id = get_game_id()
+            game = resident_game(game_id)
+            if game is None:
+                game = _new_game(game_id, requested_pack().data)
+                METRICS.inc("webtorkel_games_created_total")
+
+    trace = g.get("trace")
+    if trace is not None:
+        trace.game_id = game_id
+        trace.game = game
+    return game
+
+
+def _cookie_game() -> GameEngine:
+    # Stateless mode: the game lives in the session cookie and is rebuilt per request.
+    game = g.get("game")
+    if game is not None:
+        return game
+    state = session.get("state")
+    pack = content_pack(session.get("pack")) if state else requested_pack()
+    game = GameEngine(pack.data, pack.variants)
+    if state:
+        try:
+            game.unpack(state)
+        except ValueError:
+            pack = requested_pack()
+            game = GameEngine(pack.data, pack.variants)
+            state = None
+            session.pop("last", None)
+    if not state:
+        _admit_new_game(replacing=False)
+        METRICS.inc("webtorkel_games_created_total")
+    g.game = game
+    return game
+
+
+def _save_cookie_game(response: Response) -> Response:
+    game = g.get("game")
+    if game is not None:
+        with trace_stage("session"):
+            state = game.pack()
+            if session.get("state") != state:
+                session["state"] = state
+    return response
+
+
+def last_outcome(game_id: str) -> Optional[RollOutcome]:
+    if not STATELESS:
+        return LAST_OUTCOME.get(game_id)
+    record = session.get("last")
+    if not record or load_base_data() is None:
+        return None
+    try:
+        return unpack_outcome(record, content_pack(session.get("pack")).data, get_game().get_status())
+    except ValueError:
         return None
 
-    game_id = get_game_id()
-    game = GAMES.get(game_id)
-    if game is None:
-        game = GameEngine(data.clone())
+
+def resident_game(game_id: str) -> Optional[GameEngine]:
+    """The game for ``game_id``, rehydrated from disk if it was hibernated."""
+    while True:
+        with GAMES_LOCK:
+            game = GAMES.get(game_id)
+            # Only games that exist are tracked, so lookups of unknown ids leave no state.
+            if game is not None:
+                LAST_SEEN[game_id] = time.monotonic()
+                return game
+            moving = IN_TRANSIT.get(game_id)
+            if moving is None:
+                if game_id not in HIBERNATED:
+                    return None
+                IN_TRANSIT[game_id] = threading.Event()
+                break
+        # Another request is loading the game, or the hibernator is saving it.
+        moving.wait()
+    try:
+        return _rehydrate(game_id)
+    finally:
+        with GAMES_LOCK:
+            IN_TRANSIT.pop(game_id).set()
+
+
+def _new_game(game_id: str, data: DataStore) -> GameEngine:
+    _admit_new_game(replacing=game_id in GAMES)
+    game = _take_engine(data)
+    with GAMES_LOCK:
+        LAST_SEEN[game_id] = time.monotonic()
         GAMES[game_id] = game
-        GAME_LOGS[game_id] = []
-        LAST_STATUS[game_id] = game.get_status()
-        GAME_OVER_LOGGED.discard(game_id)
+    # A game still being hibernated is dropped by _hibernate_idle once it is saved.
+    HIBERNATED.discard(game_id)
+    _drop_log(game_id)
+    GAME_LOGS[game_id] = GameLog(game.get_status(), LOG_MEMORY_ROLLS, LOG_SPILL_DIR)
+    return game
+
+
+def _rehydrate(game_id: str) -> Optional[GameEngine]:
+    # Called with game_id in IN_TRANSIT; only installing the game takes GAMES_LOCK.
+    start = time.perf_counter()
+    state = HIBERNATED.load(game_id)
+    pack = PACKS.get(state.get("pack", DEFAULT_PACK)) if state is not None and PACKS is not None else None
+    data = pack.data if pack is not None else None
+    if state is None or data is None or state["version"] != data.version:
+        if state is not None and state["log"] is not None:
+            state["log"].close()
+        return None
+    game = _take_engine(data)
+    game.restore(state["engine"])
+    with GAMES_LOCK:
+        current = GAMES.get(game_id)
+        if current is None:
+            GAMES[game_id] = game
+            LAST_SEEN[game_id] = time.monotonic()
+            if state["log"] is not None:
+                GAME_LOGS[game_id] = state["log"]
+            if state["outcome"] is not None:
+                LAST_OUTCOME[game_id] = state["outcome"]
+    if current is not None:
+        # /reset started a new game while this one was being loaded.
+        if state["log"] is not None:
+            state["log"].close()
+        return current
+    METRICS.observe("webtorkel_rehydrate_seconds", time.perf_counter() - start)
     return game
 
 
-def _status_line(status) -> str:
-    return (
-        f"Status: name={status.name} xp={status.xp} gold={status.gold} "
-        f"form={status.form} companions={status.companions}"
+def _hibernate_idle(idle_seconds: float) -> int:
+    cutoff = time.monotonic() - idle_seconds
+    hibernated = 0
+    for game_id, seen in list(LAST_SEEN.items()):
+        if seen > cutoff:
+            continue
+        with GAMES_LOCK:
+            if LAST_SEEN.get(game_id, cutoff) > cutoff or game_id in IN_TRANSIT:
+                continue
+            LAST_SEEN.pop(game_id, None)
+            game = GAMES.pop(game_id, None)
+            if game is None:
+                continue
+            log = GAME_LOGS.pop(game_id, None)
+            outcome = LAST_OUTCOME.pop(game_id, None)
+            PREFETCHED.pop(game_id, None)
+            IN_TRANSIT[game_id] = threading.Event()
+        saved = False
+        try:
+            state = {
+                "pack": game.data.pack,
+                "version": game.data.version,
+                "engine": game.snapshot(),
+                "log": log,
+                "outcome": outcome,
+            }
+            HIBERNATED.save(game_id, state, log.spill_files() if log is not None else ())
+            saved = True
+        except OSError:
+            pass
+        finally:
+            with GAMES_LOCK:
+                IN_TRANSIT.pop(game_id).set()
+                replaced = game_id in GAMES
+                if not saved and not replaced:
+                    # Keep serving the game from memory; the next pass tries again.
+                    GAMES[game_id] = game
+                    LAST_SEEN[game_id] = time.monotonic()
+                    if log is not None:
+                        GAME_LOGS[game_id] = log
+                    if outcome is not None:
+                        LAST_OUTCOME[game_id] = outcome
+        if replaced:
+            # /reset started a new game while this one was being saved.
+            HIBERNATED.discard(game_id)
+            continue
+        if not saved:
+            continue
+        METRICS.inc("webtorkel_evictions_total", labels=(("cache", "game"),))
+        hibernated += 1
+    return hibernated
+
+
+def _expire_hibernated(max_age: float) -> None:
+    for game_id in HIBERNATED.expired(max_age):
+        # discard also deletes the game log's spill file, which closing the log would.
+        if HIBERNATED.discard(game_id):
+            METRICS.inc("webtorkel_evictions_total", labels=(("cache", "hibernated"),))
+
+
+def _run_hibernator() -> None:
+    interval = min(max(HIBERNATE_AFTER_SECONDS / 4, 1.0), 60.0)
+    while True:
+        time.sleep(interval)
+        _hibernate_idle(HIBERNATE_AFTER_SECONDS)
+        if HIBERNATE_TTL_SECONDS > 0:
+            _expire_hibernated(HIBERNATE_TTL_SECONDS)
+
+
+def start_hibernator() -> None:
+    if HIBERNATE_AFTER_SECONDS <= 0 or STATELESS:
+        return
+    threading.Thread(target=_run_hibernator, name="webtorkel-hibernator", daemon=True).start()
+
+
+def _drop_log(game_id: str) -> None:
+    log = GAME_LOGS.pop(game_id, None)
+    if log is not None:
+        log.close()
+
+
+def _record_roll(game_id: str, game: GameEngine, outcome: RollOutcome) -> None:
+    METRICS.inc("webtorkel_rolls_total")
+    if FEED.listening(game_id):
+        event = _outcome_record(game.get_round(), outcome)
+        event["game"] = game_id
+        FEED.publish(game_id, "roll", event)
+    if STATELESS:
+        session["last"] = pack_outcome(outcome)
+        if outcome.game_over and _first_finish(game):
+            _record_finished(outcome.status, game.get_round())
+        return
+    LAST_OUTCOME[game_id] = outcome
+    log = GAME_LOGS.get(game_id)
+    if log is not None:
+        log.append(outcome)
+    if outcome.game_over:
+        _log_game_over(game_id, game)
+
+
+def _log_game_over(game_id: str, game: GameEngine) -> None:
+    log = GAME_LOGS.get(game_id)
+    if log is not None and not log.finished:
+        log.finish()
+        _record_finished(game.get_status(), game.get_round())
+
+
+def _first_finish(game: GameEngine) -> bool:
+    key = (game.nonce, game.dice.seed)
+    with FINISHED_LOCK:
+        if key in FINISHED_STATELESS:
+            return False
+        FINISHED_STATELESS[key] = None
+        if len(FINISHED_STATELESS) > FINISHED_STATELESS_LIMIT:
+            FINISHED_STATELESS.popitem(last=False)
+    return True
+
+
+def _record_finished(status: PlayerStatus, rounds: int) -> None:
+    METRICS.inc("webtorkel_games_finished_total")
+    entry = LeaderboardEntry(
+        name=status.name,
+        xp=status.xp,
+        gold=status.gold,
+        rounds=rounds,
+        form=status.form,
+        finished_at=int(time.time()),
     )
+    LEADERBOARD.add(entry)
+    if RESULT_WRITER is not None:
+        RESULT_WRITER.submit(entry)
+
+
+def _roll_count(value: str) -> int:
+    if value == "all":
+        return MAX_ROLLS_PER_REQUEST
+    if value.isdigit():
+        return max(1, min(int(value), MAX_ROLLS_PER_REQUEST))
+    return 1
+
+
+def _outcome_record(round_number: int, outcome: RollOutcome) -> Dict[str, object]:
+    return {
+        "round": round_number,
+        "table": outcome.table_id,
+        "option": outcome.option,
+        "text": outcome.choice_log or outcome.choice_raw,
+        "combat": outcome.combat_text,
+        "xp": outcome.status.xp,
+        "gold": outcome.status.gold,
+        "form": outcome.status.form,
+        "companions": outcome.status.companions,
+        "game_over": outcome.game_over,
+    }
+
+
+def _stream_rolls(game_id: str, game: GameEngine, count: int) -> Iterator[str]:
+    rolled = 0
+    for outcome in game.roll_many(count):
+        rolled += 1
+        _record_roll(game_id, game, outcome)
+        record = _outcome_record(game.get_round(), outcome)
+        yield json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+    summary = {"rolled": rolled, "round": game.get_round(), "game_over": game.is_dead()}
+    yield json.dumps(summary, separators=(",", ":")) + "\n"
+
+
+def _log_chunks(lines: Iterable[str]) -> Iterator[str]:
+    buffer = []
+    size = 0
+    for line in lines:
+        buffer.append(line)
+        size += len(line) + 1
+        if size >= LOG_CHUNK_SIZE:
+            yield "\n".join(buffer) + "\n"
+            buffer = []
+            size = 0
+    if buffer:
+        yield "\n".join(buffer) + "\n"
+
+
+def _gzip_stream(chunks: Iterable[str]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def table_fragment(game: GameEngine, view: TableView) -> Markup:
+    key = (game.data.version, view.table_id, game.content_variant())
+    with FRAGMENT_LOCK:
+        fragment = TABLE_FRAGMENTS.get(key)
+        if fragment is not None:
+            TABLE_FRAGMENTS.move_to_end(key)
+            METRICS.inc("webtorkel_cache_lookups_total", labels=(("cache", "fragment"), ("result", "hit")))
+            return fragment
+    METRICS.inc("webtorkel_cache_lookups_total", labels=(("cache", "fragment"), ("result", "miss")))
+
+    with trace_stage("fragment"):
+        fragment = Markup(render_template("table_options.html", view=view))
+    if FRAGMENT_CACHE_SIZE > 0:
+        with FRAGMENT_LOCK:
+            TABLE_FRAGMENTS[key] = fragment
+            while len(TABLE_FRAGMENTS) > FRAGMENT_CACHE_SIZE:
+                TABLE_FRAGMENTS.popitem(last=False)
+                METRICS.inc("webtorkel_evictions_total", labels=(("cache", "fragment"),))
+    return fragment
 
 
-def _append_log_line(game_id: str, line: str) -> None:
-    GAME_LOGS.setdefault(game_id, []).append(line)
+def asset_url(path: str) -> str:
+    asset = ASSETS.get(path)
+    if asset is None:
+        return url_for("static", filename=path)
+    return url_for("asset", digest=asset.digest, filename=asset.path)
 
 
-def _log_outcome(game_id: str, outcome: RollOutcome) -> None:
-    _append_log_line(game_id, f"{outcome.table_id} {outcome.title}")
-    choice_text = outcome.choice_log or outcome.choice_raw
-    if choice_text:
-        _append_log_line(game_id, choice_text)
+def _srcset(assets: List[Asset]) -> str:
+    return ", ".join(f"{asset_url(asset.path)} {asset.width}w" for asset in assets if asset.width)
 
-    previous = LAST_STATUS.get(game_id)
-    if previous and (
-        previous.xp != outcome.status.xp
-        or previous.gold != outcome.status.gold
-        or previous.form != outcome.status.form
-        or previous.companions != outcome.status.companions
+
+def image_view(image_id: int) -> Optional[Dict[str, object]]:
+    image = ASSETS.image(image_id) or ASSETS.image(1)
+    if image is None:
+        return None
+    jpeg = image.jpeg + [image.original]
+    return {
+        "src": asset_url(image.original.path),
+        "width": image.original.width,
+        "height": image.original.height,
+        "srcset": _srcset(jpeg) if len(jpeg) > 1 else "",
+        "webp_srcset": _srcset(image.webp),
+    }
+
+
+def image_prefetch_url(image_id: int) -> Optional[str]:
+    image = ASSETS.image(image_id)
+    if image is None:
+        return None
+    # Browsers that can use the <picture> WebP source will pick the widest one.
+    if image.webp:
+        return asset_url(image.webp[-1].path)
+    return asset_url(image.original.path)
+
+
+def _record_shown_image(game_id: str, image_id: int) -> None:
+    hinted = PREFETCHED.get(game_id)
+    if hinted and image_id in hinted:
+        hinted.discard(image_id)
+        METRICS.inc("webtorkel_cache_lookups_total", labels=(("cache", "prefetch"), ("result", "shown")))
+
+
+def _prefetch_urls(game_id: str, candidates: Dict[int, float], shown_image_id: int) -> List[str]:
+    ranked = sorted(
+        (
+            (chance, image_id)
+            for image_id, chance in candidates.items()
+            if image_id != shown_image_id and chance >= PRELOAD_MIN_CHANCE
+        ),
+        reverse=True,
+    )
+    urls = []
+    hinted = set()
+    for _chance, image_id in ranked:
+        if len(urls) >= PRELOAD_IMAGES:
+            break
+        url = image_prefetch_url(image_id)
+        if url is not None:
+            urls.append(url)
+            hinted.add(image_id)
+    if not STATELESS:
+        PREFETCHED[game_id] = hinted
+    if hinted:
+        METRICS.inc("webtorkel_cache_lookups_total", len(hinted), (("cache", "prefetch"), ("result", "hinted")))
+    return urls
+
+
+def _render_with_prefetch(template: str, prefetch_urls: List[str], **context) -> Response:
+    with trace_stage("render"):
+        response = make_response(render_template(template, prefetch_urls=prefetch_urls, **context))
+    if prefetch_urls:
+        response.headers["Link"] = ", ".join(f"<{url}>; rel=prefetch; as=image" for url in prefetch_urls)
+    return response
+
+
+def page_etag(page: str) -> Optional[str]:
+    """Validator for a game page, computed without rendering anything.
+
+    A page only changes when the game does (a new round, in stateless mode a
+    new cookie state), when the intro has been shown, or when the name is set.
+    Every game has its own nonce (kept through hibernation and in the packed
+    cookie state), so a game started by /reset never matches a tag of the
+    previous game in the same session.
+    """
+    if BASE_DATA is None:
+        return None
+    if STATELESS:
+        state = session.get("state")
+        if not state:
+            return None
+        game_key = hashlib.sha1(state).hexdigest()
+        version = content_pack(session.get("pack")).data.version
+    else:
+        game_id = session.get("game_id")
+        game = resident_game(game_id) if game_id else None
+        if game is None:
+            return None
+        game_key = f"{game_id}:{game.nonce}:{game.get_round()}"
+        version = game.data.version
+    flags = f"{int(bool(session.get('intro_shown')))}{int(bool(session.get('name_set')))}"
+    key = f"{version}:{page}:{game_key}:{flags}"
+    return hashlib.sha1(key.encode()).hexdigest()[:24]
+
+
+def not_modified(etag: Optional[str]) -> Optional[Response]:
+    if etag is None or not request.if_none_match.contains_weak(etag):
+        return None
+    METRICS.inc("webtorkel_not_modified_total")
+    return with_etag(Response(status=304), etag)
+
+
+def with_etag(response: Response, etag: Optional[str]) -> Response:
+    if etag is not None:
+        # Weak, because compress_response may re-encode the body.
+        response.set_etag(etag, weak=True)
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        response.vary.add("Accept-Encoding")
+    return response
+
+
+def _accepted_encoding(available: Iterable[str]) -> Optional[str]:
+    accepted = request.accept_encodings
+    for encoding in available:
+        if encoding == "br" and brotli is None:
+            continue
+        if accepted[encoding]:
+            return encoding
+    return None
+
+
+def compress_response(response: Response) -> Response:
+    if (
+        response.status_code != 200
+        or response.direct_passthrough
+        or response.is_streamed
+        or "Content-Encoding" in response.headers
+        or response.mimetype not in COMPRESS_MIMETYPES
     ):
-        _append_log_line(game_id, _status_line(outcome.status))
-    LAST_STATUS[game_id] = outcome.status
-    _append_log_line(game_id, "")
+        return response
 
+    response.vary.add("Accept-Encoding")
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_SIZE:
+        return response
+    encoding = _accepted_encoding(("br", "gzip"))
+    if encoding is None:
+        return response
+    with trace_stage("compress"):
+        if encoding == "br":
+            response.set_data(brotli.compress(data, quality=5))
+        else:
+            response.set_data(gzip.compress(data, compresslevel=6, mtime=0))
+    response.headers["Content-Encoding"] = encoding
+    return response
 
-def _log_game_over(game_id: str, status) -> None:
-    if game_id in GAME_OVER_LOGGED:
-        return
-    _append_log_line(game_id, _status_line(status))
-    _append_log_line(game_id, "")
-    _append_log_line(game_id, "Game over.")
-    _append_log_line(game_id, f"Final XP: {status.xp}")
-    _append_log_line(game_id, f"Final gold: {status.gold}")
-    GAME_OVER_LOGGED.add(game_id)
-
-
-def image_url(image_id: int) -> Optional[str]:
-    if image_id in AVAILABLE_IMAGES:
-        return url_for("static", filename=f"images/{image_id}.jpg")
-    if 1 in AVAILABLE_IMAGES:
-        return url_for("static", filename="images/1.jpg")
+
+def _collect_games():
+    yield (), len(GAMES)
+
+
+def _collect_content():
+    if PACKS is not None:
+        for name in PACKS.names():
+            yield (("pack", name), ("version", PACKS.get(name).data.version)), 1
+
+
+def _collect_pool(measure):
+    def collect():
+        packs = PACKS
+        if packs is not None:
+            yield (), measure(packs)
+
+    return collect
+
+
+def _collect_load_seconds():
+    if BASE_DATA is not None:
+        yield (), CONTENT_LOAD_SECONDS
+
+
+def _collect_game_memory():
+    logs = list(GAME_LOGS.values())
+    log_bytes = sum(log.memory_bytes() for log in logs) / len(logs) if logs else 0
+    yield (), GAME_MEMORY_ESTIMATE + log_bytes
+
+
+def _collect_result_writer():
+    writer = RESULT_WRITER
+    if writer is not None:
+        yield (("state", "pending"),), writer.pending()
+        yield (("state", "written"),), writer.written
+        yield (("state", "batches"),), writer.batches
+        yield (("state", "failures"),), writer.failures
+        yield (("state", "dropped"),), writer.dropped
+
+
+def _collect_feed():
+    yield (("state", "subscribers"),), FEED.subscribers
+    yield (("state", "games_watched"),), FEED.topics()
+    yield (("state", "published"),), FEED.published
+    yield (("state", "dropped"),), FEED.dropped
+
+
+METRICS.gauge("webtorkel_active_games", "Games held in memory.", _collect_games)
+METRICS.gauge("webtorkel_hibernated_games", "Idle games stored on disk.", lambda: [((), len(HIBERNATED))])
+METRICS.gauge(
+    "webtorkel_hibernated_bytes", "Compressed size of hibernated games.", lambda: [((), HIBERNATED.total_bytes())]
+)
+METRICS.gauge("webtorkel_content_info", "Loaded content version per pack.", _collect_content)
+METRICS.gauge(
+    "webtorkel_content_strings", "Unique interned content strings.", _collect_pool(lambda packs: len(packs.strings))
+)
+METRICS.gauge(
+    "webtorkel_content_string_bytes",
+    "Memory held by the interned content strings.",
+    _collect_pool(lambda packs: packs.strings.size_bytes()),
+)
+METRICS.gauge(
+    "webtorkel_content_shared_objects",
+    "Content rows and tables shared between packs.",
+    _collect_pool(lambda packs: packs.shared_objects()),
+)
+METRICS.counter(
+    "webtorkel_content_string_lookups_total",
+    "Content strings looked up in the intern pool while loading.",
+    _collect_pool(lambda packs: packs.strings.lookups),
+)
+METRICS.gauge("webtorkel_content_load_seconds", "Duration of the initial content load.", _collect_load_seconds)
+METRICS.gauge("webtorkel_game_memory_bytes", "Estimated memory per game.", _collect_game_memory)
+METRICS.gauge(
+    "webtorkel_engine_pool_size", "Ready engines in the warm pool.", lambda: [((), ENGINE_POOL.qsize())]
+)
+METRICS.gauge(
+    "webtorkel_leaderboard_writes", "Finished games queued for and written to the database.", _collect_result_writer
+)
+METRICS.gauge("webtorkel_feed", "Live roll feed subscribers and events.", _collect_feed)
+
+
+def _start_timer() -> None:
+    g.request_start = time.perf_counter()
+    sampled = TRACE_SINK is not None and random.random() < TRACE_SAMPLE
+    if SERVER_TIMING or sampled:
+        g.trace = Trace(sampled)
+
+
+def trace_stage(name: str):
+    """Context manager timing one stage of the current request, if it is traced."""
+    trace = g.get("trace")
+    return NULL_STAGE if trace is None else trace.stage(name)
+
+
+def _finish_trace(trace: Trace, route: str, response: Response, total: float) -> None:
+    if SERVER_TIMING:
+        response.headers["Server-Timing"] = trace.server_timing(total)
+    if trace.sampled:
+        TRACE_SINK.write(
+            {
+                "ts": round(time.time(), 3),
+                "route": route,
+                "method": request.method,
+                "status": response.status_code,
+                "game": hashlib.sha1(trace.game_id.encode()).hexdigest()[:12] if trace.game_id else None,
+                "round": trace.game.get_round() if trace.game is not None else None,
+                "total_ms": round(total * 1000, 3),
+                "stages_ms": {name: round(seconds * 1000, 3) for name, seconds in trace.stages.items()},
+            }
+        )
+
+
+def _client_address() -> str:
+    return request.remote_addr or ""
+
+
+def _reject(status: int, reason: str, retry_after: float) -> Response:
+    METRICS.inc("webtorkel_rejected_total", labels=(("reason", reason),))
+    message = "Too many requests" if status == 429 else "Server busy"
+    return Response(
+        f"{message}, try again shortly.\n",
+        status=status,
+        mimetype="text/plain",
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+def _admit() -> Optional[Response]:
+    if request.endpoint in ADMISSION_EXEMPT:
+        return None
+    if INFLIGHT is not None:
+        if not INFLIGHT.acquire(blocking=False):
+            return _reject(503, "inflight", 1)
+        g.inflight = True
+    wait = ADDRESS_LIMIT.check(_client_address())
+    if wait:
+        return _reject(429, "address", wait)
+    if request.endpoint == "roll":
+        # A batch costs one token per roll and plays only as many rolls as there are tokens.
+        count = request.args.get("n")
+        granted, wait = ROLL_LIMIT.take(
+            session.get("game_id") or _client_address(), _roll_count(count) if count is not None else 1
+        )
+        if wait:
+            return _reject(429, "session", wait)
+        g.roll_budget = granted
     return None
 
 
+def _release(_exc: Optional[BaseException]) -> None:
+    if g.pop("inflight", False):
+        INFLIGHT.release()
+
+
+def _admit_new_game(replacing: bool) -> None:
+    # A new game holds a full DataStore clone, so these are checked before one is built.
+    if not replacing and not STATELESS and MAX_GAMES > 0 and len(GAMES) >= MAX_GAMES:
+        abort(_reject(503, "games", 5))
+    wait = ADDRESS_NEW_GAME_LIMIT.check(_client_address())
+    if wait:
+        abort(_reject(429, "address_new_game", wait))
+    wait = NEW_GAME_LIMIT.check()
+    if wait:
+        abort(_reject(503, "new_game", wait))
+
+
+def _observe_request(response: Response) -> Response:
+    start = g.get("request_start")
+    if start is not None:
+        route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        total = time.perf_counter() - start
+        METRICS.observe("webtorkel_request_duration_seconds", total, (("route", route),))
+        trace = g.get("trace")
+        if trace is not None:
+            _finish_trace(trace, route, response, total)
+    return response
+
+
 def create_app() -> Flask:
     app = Flask(__name__)
     app.secret_key = os.environ.get("WEBTORKEL_SECRET", "dev-secret")
+    app.jinja_env.globals["asset_url"] = asset_url
+    app.jinja_env.globals["content_packs"] = lambda: PACKS.names() if PACKS is not None else []
+    if PROXY_HOPS > 0:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=PROXY_HOPS)
+    app.before_request(_start_timer)
+    app.before_request(_admit)
+    app.teardown_request(_release)
+    app.after_request(_observe_request)
+    app.after_request(compress_response)
+    app.after_request(_save_cookie_game)
+
+    @app.route("/healthz")
+    def healthz():
+        return Response("ok\n", mimetype="text/plain")
+
+    @app.route("/readyz")
+    def readyz():
+        if BASE_DATA is None:
+            return Response(data_error() + "\n", status=503, mimetype="text/plain")
+        return Response(f"ready {BASE_DATA.version}\n", mimetype="text/plain")
+
+    @app.route("/metrics")
+    def metrics():
+        return Response(METRICS.render(), mimetype="text/plain; version=0.0.4")
+
+    @app.route("/assets/<digest>/<path:filename>")
+    def asset(digest: str, filename: str):
+        entry = ASSETS.get(filename)
+        if entry is None or entry.digest != digest:
+            abort(404)
+        encoding = _accepted_encoding(entry.encodings)
+        if encoding is None:
+            response = send_from_directory(STATIC_DIR, entry.path, max_age=ASSET_MAX_AGE)
+        else:
+            response = send_from_directory(
+                STATIC_DIR,
+                entry.path + PRECOMPRESSED[encoding],
+                mimetype=mimetypes.guess_type(entry.path)[0],
+                max_age=ASSET_MAX_AGE,
+            )
+            response.headers["Content-Encoding"] = encoding
+        if entry.encodings:
+            response.vary.add("Accept-Encoding")
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
 
     @app.route("/")
     def index():
@@ -130,9 +1053,14 @@ def create_app() -> Flask:
 
     @app.route("/table")
     def table():
+        etag = page_etag("table")
+        unchanged = not_modified(etag)
+        if unchanged is not None:
+            return unchanged
+
         game = get_game()
         if game is None:
-            return render_template("error.html", message=DATA_ERROR or "Unknown error")
+            return render_template("error.html", message=data_error())
 
         if game.is_dead():
             return redirect(url_for("game_over"))
@@ -145,23 +1073,32 @@ def create_app() -> Flask:
             intro_lines = game.get_intro_lines()
             session["intro_shown"] = True
 
-        return render_template(
+        game_id = get_game_id()
+        _record_shown_image(game_id, view.image_id)
+        prefetch_urls = _prefetch_urls(game_id, game.next_image_candidates(), view.image_id)
+
+        name_locked = session.get("name_set", False)
+        response = _render_with_prefetch(
             "table.html",
+            prefetch_urls,
             view=view,
             status=status,
             intro_lines=intro_lines,
-            image_url=image_url(view.image_id),
-            name_locked=session.get("name_set", False),
+            image=image_view(view.image_id),
+            name_locked=name_locked,
+            table_fragment=table_fragment(game, view) if name_locked else None,
+            game_id=game_id,
         )
+        return with_etag(response, etag)
 
     @app.post("/set-name")
     def set_name():
         game = get_game()
         if game is None:
-            return render_template("error.html", message=DATA_ERROR or "Unknown error")
+            return render_template("error.html", message=data_error())
 
         if not session.get("name_set"):
-            name = request.form.get("name", "").strip()
+            name = request.form.get("name", "").strip()[:NAME_MAX_LENGTH]
             game.set_player_name(name)
             session["name_set"] = True
         return redirect(url_for("table"))
@@ -170,71 +1107,172 @@ def create_app() -> Flask:
     def roll():
         game = get_game()
         if game is None:
-            return render_template("error.html", message=DATA_ERROR or "Unknown error")
+            return render_template("error.html", message=data_error())
         if game.is_dead():
             return redirect(url_for("table"))
 
-        outcome = game.roll()
-        game_id = get_game_id()
-        LAST_OUTCOME[game_id] = outcome
-        _log_outcome(game_id, outcome)
-        if outcome.game_over:
-            _log_game_over(game_id, outcome.status)
+        count = request.args.get("n")
+        if count is not None:
+            budget = min(_roll_count(count), g.get("roll_budget", MAX_ROLLS_PER_REQUEST))
+            stream = _stream_rolls(get_game_id(), game, budget)
+            if STATELESS:
+                # The new state has to be in the cookie before the response starts.
+                stream = list(stream)
+            return Response(stream, mimetype="application/x-ndjson")
+
+        with trace_stage("roll"):
+            outcome = game.roll()
+        with trace_stage("record"):
+            _record_roll(get_game_id(), game, outcome)
         return redirect(url_for("result"))
 
     @app.route("/result")
     def result():
+        etag = page_etag("result")
+        unchanged = not_modified(etag)
+        if unchanged is not None:
+            return unchanged
+
         game_id = get_game_id()
-        outcome = LAST_OUTCOME.get(game_id)
+        game = get_game() if STATELESS else resident_game(game_id)
+        outcome = last_outcome(game_id)
         if outcome is None:
             return redirect(url_for("table"))
         if outcome.game_over:
             return redirect(url_for("game_over"))
 
-        return render_template(
+        _record_shown_image(game_id, outcome.choice_image_id)
+        prefetch_urls: List[str] = []
+        if game is not None:
+            next_image_id = game.get_table_view().image_id
+            prefetch_urls = _prefetch_urls(game_id, {next_image_id: 1.0}, outcome.choice_image_id)
+
+        response = _render_with_prefetch(
             "result.html",
+            prefetch_urls,
             outcome=outcome,
             status=outcome.status,
-            image_url=image_url(outcome.choice_image_id),
+            image=image_view(outcome.choice_image_id),
             choice_text=outcome.choice_log or outcome.choice_raw,
         )
+        return with_etag(response, etag)
 
     @app.route("/game-over")
     def game_over():
         game = get_game()
         if game is None:
-            return render_template("error.html", message=DATA_ERROR or "Unknown error")
+            return render_template("error.html", message=data_error())
         if not game.is_dead():
             return redirect(url_for("table"))
 
         game_id = get_game_id()
-        outcome = LAST_OUTCOME.get(game_id)
+        outcome = last_outcome(game_id)
         status = game.get_status()
-        _log_game_over(game_id, status)
-        log_text = "\n".join(GAME_LOGS.get(game_id, []))
-        return render_template(
-            "game_over.html",
-            status=status,
-            outcome=outcome,
-            log_text=log_text,
+        _log_game_over(game_id, game)
+
+        page = request.args.get("page", "1")
+        page = int(page) if page.isdigit() and int(page) > 0 else 1
+        log = GAME_LOGS.get(game_id)
+        log_lines = []
+        if log is not None:
+            start = (page - 1) * LOG_PAGE_LINES
+            data = content_pack(game.data.pack).data
+            log_lines = list(islice(log.lines(data), start, start + LOG_PAGE_LINES + 1))
+        has_next = len(log_lines) > LOG_PAGE_LINES
+        with trace_stage("render"):
+            return render_template(
+                "game_over.html",
+                status=status,
+                outcome=outcome,
+                log_text="\n".join(log_lines[:LOG_PAGE_LINES]),
+                page=page,
+                has_next=has_next,
+            )
+
+    @app.route("/game-over/log")
+    def game_log():
+        if load_base_data() is None:
+            return render_template("error.html", message=data_error())
+        if STATELESS:
+            # No game logs are kept in stateless mode.
+            return redirect(url_for("table"))
+        game_id = get_game_id()
+        game = resident_game(game_id)
+        log = GAME_LOGS.get(game_id)
+        if log is None:
+            return redirect(url_for("table"))
+
+        chunks = _log_chunks(log.lines(content_pack(game.data.pack if game is not None else None).data))
+        headers = {
+            "Content-Disposition": 'attachment; filename="webtorkel_log.txt"',
+            "Vary": "Accept-Encoding",
+        }
+        if "gzip" in request.accept_encodings:
+            headers["Content-Encoding"] = "gzip"
+            return Response(_gzip_stream(chunks), mimetype="text/plain", headers=headers)
+        return Response(chunks, mimetype="text/plain", headers=headers)
+
+    @app.route("/feed")
+    @app.route("/feed/<game_id>")
+    def feed(game_id: str = ALL):
+        if game_id and not (game_id.isalnum() and len(game_id) <= 32):
+            abort(404)
+        subscription = FEED.subscribe(game_id)
+        if subscription is None:
+            return Response(
+                "Too many feed subscribers, try again later.\n",
+                status=503,
+                mimetype="text/plain",
+                headers={"Retry-After": "30"},
+            )
+        return Response(
+            subscription,
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
         )
 
+    @app.route("/leaderboard")
+    def leaderboard():
+        today = day_of(time.time())
+        day = request.args.get("day", "")
+        if day == "today":
+            day = today
+        days = LEADERBOARD.recent_days()
+        if day not in days:
+            day = ""
+        rankings = {field: LEADERBOARD.top(field, day or None) for field in RANKINGS}
+        with trace_stage("render"):
+            return render_template(
+                "leaderboard.html",
+                title="WebTorkel leaderboard",
+                rankings=rankings,
+                day=day,
+                days=days,
+                today=today,
+            )
+
     @app.post("/reset")
     def reset():
-        data = load_base_data()
-        if data is None:
-            return render_template("error.html", message=DATA_ERROR or "Unknown error")
+        if load_base_data() is None:
+            return render_template("error.html", message=data_error())
 
         game_id = get_game_id()
-        GAMES[game_id] = GameEngine(data.clone())
-        LAST_OUTCOME.pop(game_id, None)
-        GAME_LOGS.pop(game_id, None)
-        LAST_STATUS.pop(game_id, None)
-        GAME_OVER_LOGGED.discard(game_id)
+        pack = requested_pack()
+        if STATELESS:
+            _admit_new_game(replacing=True)
+            g.game = GameEngine(pack.data, pack.variants)
+            session.pop("last", None)
+        else:
+            _new_game(game_id, pack.data)
+            LAST_OUTCOME.pop(game_id, None)
+            PREFETCHED.pop(game_id, None)
+        METRICS.inc("webtorkel_games_reset_total")
         session.pop("intro_shown", None)
         session.pop("name_set", None)
         return redirect(url_for("table"))
 
+    start_content_loader(app)
+    start_hibernator()
     return app
 
 
@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import gzip
+import hashlib
+import struct
+import sys
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+STATIC_DIR = Path(__file__).resolve().parent / "static"
+IMAGE_DIR = STATIC_DIR / "images"
+VARIANT_DIR = IMAGE_DIR / "variants"
+
+VARIANT_WIDTHS = (320,)
+JPEG_QUALITY = 80
+WEBP_QUALITY = 75
+ASSET_MAX_AGE = 365 * 24 * 60 * 60
+
+TEXT_SUFFIXES = {".css", ".js", ".svg", ".txt"}
+PRECOMPRESSED = {"br": ".br", "gzip": ".gz"}
+
+
+@dataclass
+class Asset:
+    path: str
+    digest: str
+    size: int
+    width: int = 0
+    height: int = 0
+    encodings: List[str] = field(default_factory=list)
+
+
+@dataclass
+class ImageAsset:
+    image_id: int
+    original: Asset
+    jpeg: List[Asset] = field(default_factory=list)
+    webp: List[Asset] = field(default_factory=list)
+
+
+def jpeg_size(data: bytes) -> Tuple[int, int]:
+    """Return (width, height) from the first SOF segment of a JPEG."""
+    offset = 2
+    while offset + 9 < len(data):
+        if data[offset] != 0xFF:
+            offset += 1
+            continue
+        marker = data[offset + 1]
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            offset += 2
+            continue
+        (length,) = struct.unpack(">H", data[offset + 2 : offset + 4])
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height, width = struct.unpack(">HH", data[offset + 5 : offset + 9])
+            return width, height
+        offset += 2 + length
+    return 0, 0
+
+
+def _variant_width(path: Path) -> int:
+    # Variant files are named "<image_id>-<width>w.<ext>".
+    stem = path.stem
+    if "-" in stem and stem.endswith("w"):
+        width = stem.rsplit("-", 1)[1][:-1]
+        if width.isdigit():
+            return int(width)
+    return 0
+
+
+class AssetManifest:
+    def __init__(self, static_dir: Path = STATIC_DIR) -> None:
+        self.static_dir = static_dir
+        self.assets: Dict[str, Asset] = {}
+        self.images: Dict[int, ImageAsset] = {}
+        self._build()
+
+    def _add(self, path: Path) -> Asset:
+        data = path.read_bytes()
+        relative = path.relative_to(self.static_dir).as_posix()
+        asset = Asset(
+            path=relative,
+            digest=hashlib.sha1(data).hexdigest()[:12],
+            size=len(data),
+        )
+        if path.suffix == ".jpg":
+            asset.width, asset.height = jpeg_size(data)
+        for encoding, suffix in PRECOMPRESSED.items():
+            compressed = path.with_name(path.name + suffix)
+            if compressed.exists() and compressed.stat().st_mtime >= path.stat().st_mtime:
+                asset.encodings.append(encoding)
+        self.assets[relative] = asset
+        return asset
+
+    def _build(self) -> None:
+        for path in sorted(self.static_dir.glob("*")):
+            if path.suffix in TEXT_SUFFIXES:
+                self._add(path)
+
+        image_dir = self.static_dir / "images"
+        for path in sorted(image_dir.glob("*.jpg")):
+            if path.stem.isdigit():
+                image_id = int(path.stem)
+                self.images[image_id] = ImageAsset(image_id=image_id, original=self._add(path))
+
+        variant_dir = image_dir / "variants"
+        for path in sorted(variant_dir.glob("*")):
+            image_id = path.stem.split("-", 1)[0]
+            if not image_id.isdigit() or int(image_id) not in self.images:
+                continue
+            image = self.images[int(image_id)]
+            asset = self._add(path)
+            asset.width = _variant_width(path) or image.original.width
+            if asset.width and image.original.width:
+                asset.height = round(image.original.height * asset.width / image.original.width)
+            if path.suffix == ".webp":
+                image.webp.append(asset)
+            elif path.suffix == ".jpg":
+                image.jpeg.append(asset)
+
+        for image in self.images.values():
+            image.jpeg.sort(key=lambda asset: asset.width)
+            image.webp.sort(key=lambda asset: asset.width)
+
+    def get(self, path: str) -> Optional[Asset]:
+        return self.assets.get(path)
+
+    def image(self, image_id: int) -> Optional[ImageAsset]:
+        return self.images.get(image_id)
+
+
+def precompress(static_dir: Path = STATIC_DIR) -> int:
+    """Write .gz (and .br, if brotli is installed) copies of static text assets."""
+    written = 0
+    for path in sorted(static_dir.glob("*")):
+        if path.suffix not in TEXT_SUFFIXES:
+            continue
+        data = path.read_bytes()
+        path.with_name(path.name + ".gz").write_bytes(gzip.compress(data, compresslevel=9, mtime=0))
+        written += 1
+        if brotli is not None:
+            path.with_name(path.name + ".br").write_bytes(brotli.compress(data, quality=11))
+            written += 1
+    return written
+
+
+def build_variants(image_dir: Path = IMAGE_DIR) -> int:
+    """Write resized JPEG and WebP variants for every numbered image."""
+    from PIL import Image
+
+    variant_dir = image_dir / "variants"
+    variant_dir.mkdir(exist_ok=True)
+    written = 0
+    for path in sorted(image_dir.glob("*.jpg")):
+        if not path.stem.isdigit():
+            continue
+        with Image.open(path) as source:
+            image = source.convert("RGB")
+        image.save(variant_dir / f"{path.stem}.webp", "WEBP", quality=WEBP_QUALITY, method=6)
+        written += 1
+        for width in VARIANT_WIDTHS:
+            if width >= image.width:
+                continue
+            height = round(image.height * width / image.width)
+            resized = image.resize((width, height), Image.LANCZOS)
+            resized.save(
+                variant_dir / f"{path.stem}-{width}w.jpg",
+                "JPEG",
+                quality=JPEG_QUALITY,
+                optimize=True,
+                progressive=True,
+            )
+            resized.save(variant_dir / f"{path.stem}-{width}w.webp", "WEBP", quality=WEBP_QUALITY, method=6)
+            written += 2
+    return written
+
+
+def main() -> None:
+    if sys.argv[1:2] != ["build"]:
+        print("usage: python assets.py build")
+        return
+    print(f"Wrote {precompress()} precompressed assets to {STATIC_DIR}")
+    try:
+        written = build_variants()
+    except ImportError:
+        print("Pillow is required to build image variants: python -m pip install Pillow")
+        return
+    print(f"Wrote {written} image variants to {VARIANT_DIR}")
+
+
+if __name__ == "__main__":
+    main()
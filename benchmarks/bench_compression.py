@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import argparse
+import time
+
+from benchmarks.content import use_local_content
+
+ENCODINGS = ["identity", "gzip", "br"]
+
+
+def _finished_client(app_module):
+    while True:
+        client = app_module.app.test_client()
+        client.get("/table")
+        client.post("/set-name", data={"name": "Bench"})
+        client.post("/roll?n=all").get_data()
+        if client.get("/game-over").status_code == 200:
+            return client
+
+
+def _playing_client(app_module):
+    while True:
+        client = app_module.app.test_client()
+        client.get("/table")
+        client.post("/set-name", data={"name": "Bench"})
+        client.post("/roll")
+        if client.get("/result").status_code == 200:
+            return client
+
+
+def measure(client, route: str, encoding: str, requests: int):
+    headers = {"Accept-Encoding": encoding}
+    size = 0
+    start = time.process_time()
+    for _ in range(requests):
+        response = client.get(route, headers=headers)
+        size = len(response.get_data())
+    return size, (time.process_time() - start) / requests * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Bytes on the wire and CPU per request.")
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+
+    use_local_content()
+    import app as app_module
+
+    if app_module.brotli is None:
+        ENCODINGS.remove("br")
+
+    playing = _playing_client(app_module)
+    finished = _finished_client(app_module)
+    routes = [("/table", playing), ("/result", playing), ("/game-over", finished)]
+
+    print(f"{'route':<12}{'encoding':<10}{'bytes':>8}{'cpu us/req':>12}")
+    for route, client in routes:
+        for encoding in ENCODINGS:
+            size, cpu = measure(client, route, encoding, args.requests)
+            print(f"{route:<12}{encoding:<10}{size:>8}{cpu:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import argparse
+import time
+
+from benchmarks.content import use_local_content
+
+ROUTES = ["/table", "/result"]
+
+
+def _playing_client(app_module):
+    while True:
+        client = app_module.app.test_client()
+        client.get("/table")
+        client.post("/set-name", data={"name": "Bench"})
+        client.post("/roll")
+        if client.get("/result").status_code == 200:
+            client.get("/table")
+            return client
+
+
+def reload(client, route: str, requests: int, conditional: bool):
+    """Reload ``route`` the way a browser does: revalidating with the last ETag, or not."""
+    etag = None
+    size = 0
+    not_modified = 0
+    start = time.process_time()
+    for _ in range(requests):
+        headers = {"Accept-Encoding": "gzip"}
+        if conditional and etag is not None:
+            headers["If-None-Match"] = etag
+        response = client.get(route, headers=headers)
+        size += len(response.get_data())
+        if response.status_code == 304:
+            not_modified += 1
+        etag = response.headers.get("ETag", etag)
+    cpu = (time.process_time() - start) / requests * 1e6
+    return size / requests, cpu, not_modified
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="CPU and bytes of reload-heavy traffic with and without ETags.")
+    parser.add_argument("--requests", type=int, default=1000)
+    args = parser.parse_args()
+
+    use_local_content()
+    import app as app_module
+
+    client = _playing_client(app_module)
+    print(f"{'route':<10}{'mode':<14}{'bytes/req':>10}{'cpu us/req':>12}{'304s':>7}")
+    for route in ROUTES:
+        for conditional in (False, True):
+            size, cpu, not_modified = reload(client, route, args.requests, conditional)
+            mode = "if-none-match" if conditional else "full"
+            print(f"{route:<10}{mode:<14}{size:>10.0f}{cpu:>12.0f}{not_modified:>7}")
+
+
+if __name__ == "__main__":
+    main()
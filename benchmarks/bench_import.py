@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+from pathlib import Path
+import argparse
+import csv
+import sqlite3
+import tempfile
+import time
+
+from benchmarks.content import _sqlite_script, build_sqlite_db
+import generate_webtorkel_sql as generator
+
+
+def export_sources(db_path: Path, source_dir: Path) -> None:
+    """Recreate the original .txt files from a SQLite copy of the bundled content."""
+    source_dir.mkdir(parents=True, exist_ok=True)
+    connection = sqlite3.connect(db_path)
+    try:
+        text_lines = []
+        for row in connection.execute(
+            "SELECT label, title, option_1, option_2, option_3, option_4, option_5, option_6 "
+            "FROM table_text ORDER BY table_id"
+        ):
+            text_lines.extend(value or "" for value in row)
+        properties = [
+            " ".join(str(value) for value in row[2:])
+            for row in connection.execute("SELECT * FROM table_option_properties ORDER BY table_id, option_index")
+        ]
+        opponents = [
+            f"{correction} {xp}"
+            for correction, xp in connection.execute("SELECT correction, xp FROM opponents ORDER BY opponent_id")
+        ]
+        combat = [text or "" for (text,) in connection.execute("SELECT text FROM combat_texts ORDER BY combat_id")]
+        info = [text or "" for (text,) in connection.execute("SELECT text FROM info_lines ORDER BY line_index")]
+    finally:
+        connection.close()
+
+    for name, lines, encoding in [
+        ("text.txt", text_lines, "iso-8859-1"),
+        ("egenskaper.txt", properties, "ascii"),
+        ("motstandare.txt", opponents, "ascii"),
+        ("stridtext.txt", combat, "iso-8859-1"),
+        ("info.txt", info, "utf-8"),
+    ]:
+        with (source_dir / name).open("w", encoding=encoding, newline="") as handle:
+            handle.write("".join(line + "\n" for line in lines))
+
+
+def _tsv_value(text: str) -> str:
+    if "\\" not in text:
+        return text
+    escapes = {"\\": "\\", "t": "\t", "n": "\n", "r": "\r"}
+    out = []
+    chars = iter(text)
+    for char in chars:
+        out.append(escapes.get(next(chars, ""), "") if char == "\\" else char)
+    return "".join(out)
+
+
+def _load_data_file(connection: sqlite3.Connection, out_dir: Path, data: generator.ImportTable, fmt: str) -> None:
+    # SQLite has no LOAD DATA: parse the file and insert it in one transaction.
+    with (out_dir / f"{data.name}.{fmt}").open("r", encoding="utf-8", newline="") as handle:
+        if fmt == "csv":
+            rows = csv.reader(handle)
+        else:
+            rows = ([_tsv_value(value) for value in line.rstrip("\n").split("\t")] for line in handle)
+        header = next(rows)
+        placeholders = ", ".join("?" for _ in header)
+        with connection:
+            connection.executemany(
+                f"INSERT INTO {data.table} ({', '.join(header)}) VALUES ({placeholders})",
+                rows,
+            )
+
+
+def import_seconds(out_dir: Path, tables, fmt: str, db_path: Path) -> float:
+    if db_path.exists():
+        db_path.unlink()
+    connection = sqlite3.connect(db_path)
+    try:
+        connection.executescript(_sqlite_script((out_dir / "schema.sql").read_text(encoding="utf-8")))
+        start = time.perf_counter()
+        for data in tables:
+            if fmt in ("csv", "tsv"):
+                _load_data_file(connection, out_dir, data, fmt)
+            else:
+                connection.executescript(_sqlite_script((out_dir / f"{data.name}.sql").read_text(encoding="utf-8")))
+        seconds = time.perf_counter() - start
+        rows = connection.execute("SELECT COUNT(*) FROM table_option_properties").fetchone()[0]
+        if rows != len(tables[1].rows):
+            raise RuntimeError(f"{fmt}: imported {rows} property rows")
+        return seconds
+    finally:
+        connection.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Import time of each generate_webtorkel_sql.py format into SQLite.")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    work = Path(tempfile.mkdtemp(prefix="webtorkel-import-"))
+    build_sqlite_db(work / "content.db")
+    export_sources(work / "content.db", work / "source")
+    tables = [read_rows(work / "source") for _table, _source, read_rows in generator.IMPORTS]
+
+    print(f"{'format':<10}{'files KB':>10}{'import ms':>11}")
+    for fmt in generator.FORMATS:
+        out_dir = work / fmt
+        out_dir.mkdir()
+        generator.write_schema(out_dir / "schema.sql")
+        for data in tables:
+            generator.write_import(out_dir, data, fmt)
+        size = sum(path.stat().st_size for path in out_dir.iterdir() if path.name != "schema.sql")
+        seconds = min(import_seconds(out_dir, tables, fmt, work / f"{fmt}.db") for _ in range(args.repeat))
+        print(f"{fmt:<10}{size / 1024:>10.0f}{seconds * 1000:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+from pathlib import Path
+import argparse
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.content import build_sqlite_db
+
+
+def build_translation(base_db: Path, db_path: Path, index: int) -> None:
+    """Copy of ``base_db`` with a third of the titles and first options reworded."""
+    db_path.write_bytes(base_db.read_bytes())
+    connection = sqlite3.connect(db_path)
+    try:
+        connection.execute(
+            "UPDATE table_text SET title = ? || title, option_1 = ? || option_1 WHERE table_id % 3 = 0",
+            (f"[{index}] ", f"[{index}] "),
+        )
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def measure(db_paths, shared: bool):
+    """Seconds and retained bytes to load every pack with its content variants."""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    import webtorkel
+    from packs import ContentRegistry
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    registry = ContentRegistry()
+    stores = []
+    for index, db_path in enumerate(db_paths):
+        engine = create_engine(f"sqlite:///{db_path}", future=True)
+        with sessionmaker(bind=engine, future=True)() as session:
+            if shared:
+                registry.load(f"pack{index}", session)
+            else:
+                stores.append(webtorkel.DataStore(session).variants())
+        engine.dispose()
+    seconds = time.perf_counter() - start
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return seconds, retained, len(registry.strings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Memory of N content packs, independent vs one shared registry.")
+    parser.add_argument("--packs", type=int, nargs="+", default=[1, 4, 16])
+    args = parser.parse_args()
+
+    work = Path(tempfile.mkdtemp(prefix="webtorkel-packs-"))
+    base_db = work / "pack0.db"
+    build_sqlite_db(base_db)
+    db_paths = [base_db]
+    for index in range(1, max(args.packs)):
+        db_paths.append(work / f"pack{index}.db")
+        build_translation(base_db, db_paths[-1], index)
+
+    measure(db_paths[:1], True)  # import and warm up SQLAlchemy outside the measurements
+    print(f"{'packs':>5}  {'mode':<12}{'load ms':>9}{'KB':>9}{'KB/pack':>9}{'strings':>9}")
+    for count in args.packs:
+        for shared in (False, True):
+            seconds, retained, strings = measure(db_paths[:count], shared)
+            mode = "registry" if shared else "independent"
+            print(
+                f"{count:>5}  {mode:<12}{seconds * 1000:>9.0f}{retained / 1024:>9.0f}"
+                f"{retained / 1024 / count:>9.0f}{strings if shared else '-':>9}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+from pathlib import Path
+import argparse
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.bench_import import export_sources
+from benchmarks.content import _sqlite_script, build_sqlite_db
+import generate_webtorkel_sql as generator
+
+TABLES = {"dense": "table_option_properties", "sparse": "table_option_values"}
+
+
+def build_sparse_db(dense_db: Path, db_path: Path) -> None:
+    """Copy of ``dense_db`` whose option properties live in table_option_values only."""
+    work = db_path.parent / "sparse-source"
+    export_sources(dense_db, work)
+    data = generator.sparse_properties(generator.properties_rows(work))
+    generator.write_import(work, data)
+    db_path.write_bytes(dense_db.read_bytes())
+    connection = sqlite3.connect(db_path)
+    try:
+        connection.execute("DELETE FROM table_option_properties")
+        connection.executescript(_sqlite_script((work / f"{data.name}.sql").read_text(encoding="utf-8")))
+        connection.commit()
+        connection.execute("VACUUM")
+    finally:
+        connection.close()
+
+
+def table_bytes(db_path: Path, table: str) -> int:
+    connection = sqlite3.connect(db_path)
+    try:
+        (size,) = connection.execute("SELECT SUM(pgsize) FROM dbstat WHERE name LIKE ?", (f"%{table}%",)).fetchone()
+        return size or 0
+    finally:
+        connection.close()
+
+
+def measure_load(db_path: Path, layout: str, repeat: int):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    import webtorkel
+
+    Session = sessionmaker(bind=create_engine(f"sqlite:///{db_path}", future=True), future=True)
+    best = float("inf")
+    for _ in range(repeat):
+        with Session() as session:
+            start = time.perf_counter()
+            data = webtorkel.DataStore(session, props_layout=layout)
+            best = min(best, time.perf_counter() - start)
+    with Session() as session:
+        tracemalloc.start()
+        webtorkel.DataStore(session, props_layout=layout)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return best, peak, data.version
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Dense vs sparse option property storage.")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    work = Path(tempfile.mkdtemp(prefix="webtorkel-props-"))
+    dense_db = work / "dense.db"
+    build_sqlite_db(dense_db)
+    sparse_db = work / "sparse.db"
+    build_sparse_db(dense_db, sparse_db)
+
+    print(f"{'layout':<8}{'table KB':>10}{'load ms':>9}{'peak KB':>9}  version")
+    for layout, db_path in (("dense", dense_db), ("sparse", sparse_db)):
+        seconds, peak, version = measure_load(db_path, layout, args.repeat)
+        size = table_bytes(db_path, TABLES[layout])
+        print(f"{layout:<8}{size / 1024:>10.0f}{seconds * 1000:>9.1f}{peak / 1024:>9.0f}  {version}")
+
+
+if __name__ == "__main__":
+    main()
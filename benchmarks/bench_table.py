@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import argparse
+import time
+
+from benchmarks.content import use_local_content
+
+
+def run(app_module, requests: int) -> float:
+    client = app_module.app.test_client()
+    client.get("/table")
+    client.post("/set-name", data={"name": "Bench"})
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        client.get("/table")
+    return requests / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Request rate of GET /table.")
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    use_local_content()
+    import app as app_module
+
+    app_module.FRAGMENT_CACHE_SIZE = 0
+    uncached = run(app_module, args.requests)
+
+    app_module.FRAGMENT_CACHE_SIZE = 512
+    app_module.TABLE_FRAGMENTS.clear()
+    cached = run(app_module, args.requests)
+
+    print(f"/table without fragment cache: {uncached:8.0f} req/s")
+    print(f"/table with fragment cache:    {cached:8.0f} req/s")
+    lookups = {
+        dict(labels)["result"]: int(count)
+        for (name, labels), count in app_module.METRICS.snapshot().counters.items()
+        if name == "webtorkel_cache_lookups_total" and dict(labels)["cache"] == "fragment"
+    }
+    print(f"fragment cache: {lookups}")
+
+
+if __name__ == "__main__":
+    main()
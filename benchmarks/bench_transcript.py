@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from contextlib import redirect_stdout
+from pathlib import Path
+import argparse
+import random
+import tempfile
+import time
+
+from benchmarks.content import use_local_content
+
+MODES = [
+    ("line", False),
+    ("round", False),
+    ("size", False),
+    ("exit", False),
+    ("size", True),
+]
+
+
+def run(webtorkel, data, flush: str, background: bool, games: int, max_rounds: int, log_path: Path):
+    rounds = 0
+    start = time.perf_counter()
+    with open(log_path.with_suffix(".stdout"), "w", encoding="utf-8") as console, redirect_stdout(console):
+        for seed in range(games):
+            random.seed(seed)
+            transcript = webtorkel.Transcript(log_path, flush=flush, background=background)
+            engine = webtorkel.GameEngine(data.clone())
+            try:
+                webtorkel.GameCLI(engine, transcript).simulate(max_rounds=max_rounds)
+            finally:
+                transcript.close()
+            rounds += engine.get_round()
+    return rounds, time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Wall time of --simulate per transcript flush mode.")
+    parser.add_argument("--games", type=int, default=200)
+    parser.add_argument("--max-rounds", type=int, default=10000)
+    parser.add_argument("--gzip", action="store_true", help="write a .gz log")
+    args = parser.parse_args()
+
+    use_local_content()
+    import webtorkel
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    Session = sessionmaker(bind=create_engine(webtorkel.DB_URL, future=True), future=True)
+    with Session() as session:
+        data = webtorkel.DataStore(session)
+
+    log_path = Path(tempfile.mkdtemp(prefix="webtorkel-bench-")) / ("log.txt.gz" if args.gzip else "log.txt")
+    print(f"{'flush':<8}{'writer':<12}{'rounds':>8}{'wall s':>9}{'us/round':>10}")
+    for flush, background in MODES:
+        rounds, seconds = run(webtorkel, data, flush, background, args.games, args.max_rounds, log_path)
+        writer = "background" if background else "inline"
+        print(f"{flush:<8}{writer:<12}{rounds:>8}{seconds:>9.3f}{seconds / rounds * 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
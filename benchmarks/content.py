@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+from pathlib import Path
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+
+SQL_DIR = Path(__file__).resolve().parent.parent / "webtorkel_sql"
+IMPORT_FILES = [
+    "import_text.sql",
+    "import_egenskaper.sql",
+    "import_motstandare.sql",
+    "import_stridtext.sql",
+    "import_info.sql",
+]
+ADMISSION_SETTINGS = [
+    "WEBTORKEL_ROLL_RATE",
+    "WEBTORKEL_ADDRESS_RATE",
+    "WEBTORKEL_NEW_GAME_RATE",
+    "WEBTORKEL_ADDRESS_NEW_GAME_RATE",
+    "WEBTORKEL_MAX_GAMES",
+    "WEBTORKEL_MAX_INFLIGHT",
+]
+
+
+def _sqlite_script(text: str) -> str:
+    # Drop the MariaDB-only statements and table options and map AUTO_INCREMENT;
+    # the rest is portable.
+    lines = [
+        line
+        for line in text.splitlines()
+        if not line.startswith(("CREATE DATABASE", "USE "))
+    ]
+    script = re.sub(r"\)\s*ENGINE=[^;]*;", ");", "\n".join(lines))
+    return script.replace("INT NOT NULL AUTO_INCREMENT PRIMARY KEY", "INTEGER PRIMARY KEY AUTOINCREMENT")
+
+
+def build_sqlite_db(db_path: Path) -> None:
+    if db_path.exists():
+        db_path.unlink()
+    connection = sqlite3.connect(db_path)
+    try:
+        connection.executescript(_sqlite_script((SQL_DIR / "schema.sql").read_text(encoding="utf-8")))
+        for name in IMPORT_FILES:
+            connection.executescript(_sqlite_script((SQL_DIR / name).read_text(encoding="utf-8")))
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def use_local_content() -> str:
+    """Point WEBTORKEL_DB_URL at a fresh SQLite copy of the bundled content.
+
+    Also switches off admission control (unless set explicitly), since every
+    benchmark request comes from one address. Must run before ``webtorkel`` or
+    ``app`` is imported.
+    """
+    db_path = Path(tempfile.gettempdir()) / "webtorkel_bench.db"
+    build_sqlite_db(db_path)
+    url = f"sqlite:///{db_path}"
+    os.environ["WEBTORKEL_DB_URL"] = url
+    for name in ADMISSION_SETTINGS:
+        os.environ.setdefault(name, "0")
+    return url
+
+
+def main() -> None:
+    db_path = Path(sys.argv[1]) if len(sys.argv) > 1 else Path("webtorkel.db")
+    build_sqlite_db(db_path)
+    print(f"WEBTORKEL_DB_URL=sqlite:///{db_path.resolve()}")
+
+
+if __name__ == "__main__":
+    main()
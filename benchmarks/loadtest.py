@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Tuple
+import argparse
+import http.cookiejar
+import os
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from benchmarks.content import use_local_content
+
+ROUTES = ["/table", "/set-name", "/roll", "/result", "/game-over", "/reset"]
+
+
+class InProcessClient:
+    def __init__(self, app) -> None:
+        self._client = app.test_client()
+
+    def request(self, method: str, path: str, data: Optional[Dict[str, str]] = None) -> Tuple[int, str]:
+        response = self._client.open(path, method=method, data=data)
+        response.get_data()
+        return response.status_code, response.headers.get("Location", "")
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+class HttpClient:
+    def __init__(self, base_url: str) -> None:
+        self._base_url = base_url.rstrip("/")
+        self._opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()),
+            _NoRedirect(),
+        )
+
+    def request(self, method: str, path: str, data: Optional[Dict[str, str]] = None) -> Tuple[int, str]:
+        body = urllib.parse.urlencode(data or {}).encode() if method == "POST" else None
+        req = urllib.request.Request(self._base_url + path, data=body, method=method)
+        try:
+            with self._opener.open(req, timeout=30) as response:
+                response.read()
+                return response.status, response.headers.get("Location", "")
+        except urllib.error.HTTPError as exc:
+            exc.read()
+            return exc.code, exc.headers.get("Location", "")
+
+
+class Recorder:
+    def __init__(self) -> None:
+        self.latencies: Dict[str, List[float]] = {route: [] for route in ROUTES}
+        self.errors: Dict[str, int] = {route: 0 for route in ROUTES}
+        self._lock = threading.Lock()
+
+    def record(self, route: str, seconds: float, status: int) -> None:
+        with self._lock:
+            self.latencies[route].append(seconds)
+            if status >= 400:
+                self.errors[route] += 1
+
+
+class VirtualPlayer:
+    def __init__(self, client, recorder: Recorder, reset_chance: float) -> None:
+        self.client = client
+        self.recorder = recorder
+        self.reset_chance = reset_chance
+        self.started = False
+
+    def _call(self, method: str, route: str, data: Optional[Dict[str, str]] = None) -> Tuple[int, str]:
+        start = time.perf_counter()
+        status, location = self.client.request(method, route, data)
+        self.recorder.record(route, time.perf_counter() - start, status)
+        return status, location
+
+    def step(self) -> None:
+        if not self.started:
+            self._call("GET", "/table")
+            self._call("POST", "/set-name", {"name": "Load"})
+            self.started = True
+
+        location = self._call("GET", "/table")[1]
+        if location.endswith("/game-over"):
+            self._call("GET", "/game-over")
+            self._restart()
+            return
+
+        self._call("POST", "/roll")
+        location = self._call("GET", "/result")[1]
+        if location.endswith("/game-over"):
+            self._call("GET", "/game-over")
+            self._restart()
+        elif random.random() < self.reset_chance:
+            self._restart()
+
+    def _restart(self) -> None:
+        self._call("POST", "/reset")
+        self.started = False
+
+
+def _rss_bytes(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as handle:
+            for line in handle:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(round(fraction * (len(values) - 1))))
+    return values[index]
+
+
+def run(
+    make_client,
+    players: int,
+    workers: int,
+    duration: float,
+    reset_chance: float,
+    memory_pid: int,
+    games=None,
+) -> None:
+    recorder = Recorder()
+    pool = [VirtualPlayer(make_client(), recorder, reset_chance) for _ in range(players)]
+    deadline = time.perf_counter() + duration
+    stop = threading.Event()
+
+    def work(mine: List[VirtualPlayer]) -> None:
+        while not stop.is_set():
+            for player in mine:
+                if time.perf_counter() >= deadline:
+                    stop.set()
+                    return
+                player.step()
+
+    threads = [
+        threading.Thread(target=work, args=(pool[index::workers],), daemon=True)
+        for index in range(workers)
+    ]
+    start = time.perf_counter()
+    samples = [(0.0, _rss_bytes(memory_pid), len(games) if games is not None else -1)]
+    for thread in threads:
+        thread.start()
+    interval = max(1.0, duration / 10)
+    while not stop.wait(interval):
+        samples.append(
+            (time.perf_counter() - start, _rss_bytes(memory_pid), len(games) if games is not None else -1)
+        )
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    samples.append((elapsed, _rss_bytes(memory_pid), len(games) if games is not None else -1))
+
+    total = sum(len(values) for values in recorder.latencies.values())
+    print(f"{players} players, {workers} workers, {elapsed:.1f}s, {total} requests, {total / elapsed:.0f} req/s")
+    print(f"{'route':<12}{'count':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}")
+    for route in ROUTES:
+        values = sorted(recorder.latencies[route])
+        print(
+            f"{route:<12}{len(values):>8}{len(values) / elapsed:>9.0f}"
+            f"{_percentile(values, 0.50) * 1000:>9.2f}"
+            f"{_percentile(values, 0.95) * 1000:>9.2f}"
+            f"{_percentile(values, 0.99) * 1000:>9.2f}"
+            f"{recorder.errors[route]:>8}"
+        )
+
+    print()
+    print(f"{'t (s)':>8}{'RSS MiB':>10}{'games':>8}")
+    for seconds, rss, game_count in samples:
+        games_column = str(game_count) if game_count >= 0 else "-"
+        print(f"{seconds:>8.1f}{rss / (1024 * 1024):>10.1f}{games_column:>8}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Simulate many players against the WebTorkel app.")
+    parser.add_argument("--players", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--reset-chance", type=float, default=0.01, help="chance of a voluntary reset per roll")
+    parser.add_argument("--url", help="base URL of a running server; default runs the WSGI app in-process")
+    parser.add_argument("--server-pid", type=int, default=0, help="sample RSS of this process (with --url)")
+    args = parser.parse_args()
+
+    if args.url:
+        run(
+            lambda: HttpClient(args.url),
+            args.players,
+            args.workers,
+            args.duration,
+            args.reset_chance,
+            args.server_pid,
+        )
+        return
+
+    use_local_content()
+    import app as app_module
+
+    run(
+        lambda: InProcessClient(app_module.app),
+        args.players,
+        args.workers,
+        args.duration,
+        args.reset_chance,
+        os.getpid(),
+        app_module.GAMES,
+    )
+
+
+if __name__ == "__main__":
+    main()
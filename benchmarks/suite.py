@@ -0,0 +1,341 @@
+from __future__ import annotations
+
+from contextlib import redirect_stdout
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+import argparse
+import fnmatch
+import itertools
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from benchmarks.content import use_local_content
+
+# Baselines are machine specific, so they are recorded locally and not committed.
+BASELINE_DIR = Path(__file__).resolve().parent / "baselines"
+DEFAULT_BASELINE = BASELINE_DIR / "default.json"
+DEFAULT_THRESHOLD = 0.15
+# Wider thresholds for cases dominated by SQLite, the file system or Flask, and
+# for rolls, which vary more between processes than the other engine cases.
+CASE_THRESHOLDS = {
+    "datastore.load[*": 0.30,
+    "engine.roll[*": 0.30,
+    "cli.simulate[*": 0.30,
+    "route.*": 0.40,
+}
+SIMULATE_GAMES = 10
+# Calls of calibrate() timed next to every run of a case.
+CALIBRATION_NUMBER = 20
+
+# A case is a name and a setup function returning the operation to time.
+Case = Tuple[str, Callable[[], Callable[[], object]]]
+
+
+def calibrate() -> None:
+    """Fixed interpreter work whose speed tracks how fast this process runs right now."""
+    totals: Dict[int, int] = {}
+    for value in range(2000):
+        totals[value % 97] = totals.get(value % 97, 0) + value
+
+
+def _seconds_per_call(op: Callable[[], object], number: int) -> float:
+    start = time.perf_counter()
+    for _ in range(number):
+        op()
+    return (time.perf_counter() - start) / number
+
+
+def time_case(setup: Callable[[], Callable[[], object]], repeat: int, min_seconds: float) -> Dict[str, float]:
+    """Seconds per call of the operation ``setup`` returns: best and median of ``repeat`` runs.
+
+    Each run is preceded by timing ``calibrate``. ``best_relative`` and
+    ``median_relative`` are the runs divided by their calibration, which
+    cancels out how fast the machine happened to be during the run.
+    """
+    op = setup()
+    number = 1
+    while True:
+        elapsed = _seconds_per_call(op, number) * number
+        if elapsed >= min_seconds:
+            break
+        number *= 2 if elapsed <= 0 else max(2, min(10, int(min_seconds / elapsed) + 1))
+    runs = []
+    relative = []
+    for _ in range(repeat):
+        calibration = _seconds_per_call(calibrate, CALIBRATION_NUMBER)
+        runs.append(_seconds_per_call(op, number))
+        relative.append(runs[-1] / calibration)
+    return {
+        "best": min(runs),
+        "median": statistics.median(runs),
+        "best_relative": min(relative),
+        "median_relative": statistics.median(relative),
+        "number": number,
+    }
+
+
+def _sessionmaker(url: str):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    return sessionmaker(bind=create_engine(url, future=True), future=True)
+
+
+def _roll_on(engine, tables: List[int]):
+    cycle = itertools.cycle(tables)
+
+    def op():
+        engine.current_table = next(cycle)
+        engine.player.dead = False
+        engine.roll()
+
+    return op
+
+
+def build_cases(db_url: str, extra_backends: Dict[str, str]) -> List[Case]:
+    import webtorkel
+
+    from benchmarks.bench_props_layout import build_sparse_db
+
+    Session = _sessionmaker(db_url)
+    with Session() as session:
+        data = webtorkel.DataStore(session)
+
+    sparse_db = Path(tempfile.mkdtemp(prefix="webtorkel-suite-")) / "sparse.db"
+    build_sparse_db(Path(db_url.replace("sqlite:///", "", 1)), sparse_db)
+    backends = {"sqlite": (db_url, "dense"), "sqlite-sparse": (f"sqlite:///{sparse_db}", "sparse")}
+    backends.update({name: (url, "dense") for name, url in extra_backends.items()})
+
+    def load(url: str, layout: str):
+        def setup():
+            Session = _sessionmaker(url)
+
+            def op():
+                with Session() as session:
+                    webtorkel.DataStore(session, props_layout=layout)
+
+            return op
+
+        return setup
+
+    def engine():
+        random.seed(1)
+        return webtorkel.GameEngine(data.clone())
+
+    playable = [table_id for table_id in range(1, webtorkel.TABLE_COUNT) if table_id in data.tables]
+    combat = [
+        table_id
+        for table_id in playable
+        if sum(1 for option in range(1, 7) if data.get_props(table_id, option)[14]) >= 3
+    ]
+
+    def change_gender():
+        game = engine()
+
+        def op():
+            if game.player.gender >= 6:
+                game.player.gender = 1
+            game._change_gender()
+
+        return op
+
+    def simulate():
+        log_path = Path(tempfile.mkdtemp(prefix="webtorkel-suite-")) / "log.txt"
+
+        def op():
+            # The same ten seeded games every time, so every run does the same work.
+            # They share one transcript, which truncates the log when it opens.
+            with open(os.devnull, "w") as console, redirect_stdout(console):
+                transcript = webtorkel.Transcript(log_path, flush="exit")
+                try:
+                    for seed in range(SIMULATE_GAMES):
+                        random.seed(seed)
+                        webtorkel.GameCLI(webtorkel.GameEngine(data.clone()), transcript).simulate()
+                finally:
+                    transcript.close()
+
+        return op
+
+    cases: List[Case] = [
+        (f"datastore.load[{name}]", load(url, layout)) for name, (url, layout) in backends.items()
+    ]
+    cases += [
+        ("datastore.clone", lambda: data.clone),
+        ("engine.roll[normal]", lambda: _roll_on(engine(), playable)),
+        ("engine.roll[random-226]", lambda: _roll_on(engine(), [226])),
+        ("engine.roll[combat]", lambda: _roll_on(engine(), combat)),
+        ("engine.change_gender", change_gender),
+        (f"cli.simulate[{SIMULATE_GAMES} games]", simulate),
+    ]
+    return cases + route_cases()
+
+
+def route_cases() -> List[Case]:
+    import app as app_module
+
+    app_module.CONTENT_READY.wait(60)
+
+    def client():
+        test_client = app_module.app.test_client()
+        test_client.get("/table")
+        test_client.post("/set-name", data={"name": "Bench"})
+        return test_client
+
+    def get(path: str):
+        def setup():
+            test_client = client()
+            test_client.post("/roll")
+            return lambda: test_client.get(path)
+
+        return setup
+
+    def roll():
+        test_client = client()
+
+        def op():
+            response = test_client.post("/roll")
+            if "game-over" in response.headers.get("Location", ""):
+                test_client.post("/reset")
+                test_client.post("/set-name", data={"name": "Bench"})
+
+        return op
+
+    return [
+        ("route.table", get("/table")),
+        ("route.result", get("/result")),
+        ("route.roll", roll),
+    ]
+
+
+def run(patterns: List[str], repeat: int, min_seconds: float, extra_backends: Dict[str, str]) -> Dict[str, object]:
+    db_url = use_local_content()
+    results: Dict[str, Dict[str, float]] = {}
+    for name, setup in build_cases(db_url, extra_backends):
+        if patterns and not any(fnmatch.fnmatch(name, pattern) for pattern in patterns):
+            continue
+        results[name] = time_case(setup, repeat, min_seconds)
+        print(f"{name:<28}{results[name]['best'] * 1e6:>12.1f} us", flush=True)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+        "results": results,
+    }
+
+
+def case_threshold(name: str, threshold: float) -> float:
+    """``threshold``, or the wider one CASE_THRESHOLDS sets for ``name``."""
+    for pattern, case in CASE_THRESHOLDS.items():
+        if fnmatch.fnmatchcase(name, pattern):
+            return max(threshold, case)
+    return threshold
+
+
+def compare(baseline: Dict[str, object], current: Dict[str, object], threshold: float) -> List[str]:
+    """Print the change per case; return the names of cases that regressed.
+
+    Changes are measured on the calibrated timings when both files have them.
+    A case regressed when both its best and its median run are slower than
+    the baseline by more than its threshold, so one noisy run cannot fail it.
+    """
+    regressions = []
+    old_results = baseline["results"]
+    print(f"{'case':<28}{'baseline us':>12}{'current us':>12}{'best':>9}{'median':>9}{'limit':>7}")
+    for name, result in current["results"].items():
+        old = old_results.get(name)
+        if old is None:
+            print(f"{name:<28}{'-':>12}{result['best'] * 1e6:>12.1f}{'new':>9}")
+            continue
+        limit = case_threshold(name, threshold)
+        suffix = "_relative" if "best_relative" in result and "best_relative" in old else ""
+        best = result["best" + suffix] / old["best" + suffix] - 1
+        median = result["median" + suffix] / old["median" + suffix] - 1
+        flag = ""
+        if best > limit and median > limit:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(
+            f"{name:<28}{old['best'] * 1e6:>12.1f}{result['best'] * 1e6:>12.1f}"
+            f"{best:>+9.1%}{median:>+9.1%}{limit:>7.0%}{flag}"
+        )
+    return regressions
+
+
+def _load(path: Path) -> Dict[str, object]:
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def _save(path: Path, results: Dict[str, object]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(results, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+
+
+def _backends(values: Optional[List[str]]) -> Dict[str, str]:
+    backends = {}
+    for value in values or []:
+        name, _, url = value.partition("=")
+        if not url:
+            raise SystemExit(f"--backend expects NAME=URL, got {value!r}")
+        backends[name] = url
+    return backends
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="WebTorkel benchmark suite with JSON baselines.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the suite")
+    run_parser.add_argument("patterns", nargs="*", help="only cases matching these glob patterns")
+    run_parser.add_argument("--output", type=Path, help="write results as JSON")
+    run_parser.add_argument(
+        "--compare",
+        type=Path,
+        nargs="?",
+        const=DEFAULT_BASELINE,
+        help=f"compare against this baseline (default {DEFAULT_BASELINE.name}); exit 1 on regressions. "
+        "A missing baseline is recorded from this run instead",
+    )
+    run_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    run_parser.add_argument("--repeat", type=int, default=5)
+    run_parser.add_argument("--min-seconds", type=float, default=0.2, help="minimum duration of one timed run")
+    run_parser.add_argument(
+        "--backend",
+        action="append",
+        metavar="NAME=URL",
+        help="also time DataStore loads from this SQLAlchemy URL (e.g. a local MariaDB)",
+    )
+
+    compare_parser = commands.add_parser("compare", help="compare two result files")
+    compare_parser.add_argument("baseline", type=Path)
+    compare_parser.add_argument("current", type=Path)
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+
+    args = parser.parse_args()
+    if args.command == "compare":
+        regressions = compare(_load(args.baseline), _load(args.current), args.threshold)
+    else:
+        current = run(args.patterns, args.repeat, args.min_seconds, _backends(args.backend))
+        if args.output:
+            _save(args.output, current)
+        regressions = []
+        if args.compare and not args.compare.exists():
+            _save(args.compare, current)
+            print(f"no baseline at {args.compare}; recorded this run as the baseline")
+        elif args.compare:
+            regressions = compare(_load(args.compare), current, args.threshold)
+
+    if regressions:
+        print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
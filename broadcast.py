@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+from collections import deque
+from itertools import islice
+from typing import Deque, Dict, Iterator, Optional
+import json
+import threading
+
+ALL = ""
+HEARTBEAT = b": keep-alive\n\n"
+
+
+class _Topic:
+    __slots__ = ("events", "next_seq", "subscribers", "changed")
+
+    def __init__(self, capacity: int, lock: threading.Lock) -> None:
+        self.events: Deque[bytes] = deque(maxlen=capacity)
+        self.next_seq = 0
+        self.subscribers = 0
+        self.changed = threading.Condition(lock)
+
+
+class Broadcaster:
+    """Fan-out of server-sent events to per-key and all-keys subscribers.
+
+    Each topic keeps the last ``capacity`` events in one ring shared by all of
+    its subscribers, which only hold a read position, so memory does not grow
+    with the number of subscribers. An event is serialized once, however many
+    topics and subscribers receive it. A subscriber that falls more than
+    ``capacity`` events behind is disconnected.
+    """
+
+    def __init__(self, capacity: int = 64, max_subscribers: int = 5000, heartbeat_seconds: float = 15.0) -> None:
+        self.capacity = capacity
+        self.max_subscribers = max_subscribers
+        self.heartbeat_seconds = heartbeat_seconds
+        self._lock = threading.Lock()
+        self._topics: Dict[str, _Topic] = {ALL: _Topic(capacity, self._lock)}
+        self.subscribers = 0
+        self.published = 0
+        self.dropped = 0
+
+    def listening(self, key: str) -> bool:
+        return key in self._topics and key != ALL or self._topics[ALL].subscribers > 0
+
+    def publish(self, key: str, event: str, payload: Dict[str, object]) -> bool:
+        if not self.listening(key):
+            return False
+        everyone = self._topics[ALL]
+        data = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+        message = f"event: {event}\ndata: {data}\n\n".encode("utf-8")
+        with self._lock:
+            for target in (everyone, self._topics.get(key)):
+                if target is not None and target.subscribers:
+                    target.events.append(message)
+                    target.next_seq += 1
+                    target.changed.notify_all()
+        self.published += 1
+        return True
+
+    def subscribe(self, key: str = ALL) -> Optional["Subscription"]:
+        """Reserve a subscriber slot; None when the process is at its limit."""
+        with self._lock:
+            if self.subscribers >= self.max_subscribers:
+                return None
+            topic = self._topics.get(key)
+            if topic is None:
+                topic = self._topics[key] = _Topic(self.capacity, self._lock)
+            topic.subscribers += 1
+            self.subscribers += 1
+            position = topic.next_seq
+        return Subscription(self, key, topic, position)
+
+    def _stream(self, topic: _Topic, position: int) -> Iterator[bytes]:
+        yield HEARTBEAT
+        while True:
+            with self._lock:
+                if position == topic.next_seq:
+                    topic.changed.wait(self.heartbeat_seconds)
+                first = topic.next_seq - len(topic.events)
+                if position < first:
+                    self.dropped += 1
+                    break
+                pending = list(islice(topic.events, position - first, None))
+                position = topic.next_seq
+            yield b"".join(pending) if pending else HEARTBEAT
+        yield b"event: dropped\ndata: {}\n\n"
+
+    def _unsubscribe(self, key: str, topic: _Topic) -> None:
+        with self._lock:
+            topic.subscribers -= 1
+            self.subscribers -= 1
+            if key != ALL and topic.subscribers == 0 and self._topics.get(key) is topic:
+                del self._topics[key]
+
+    def topics(self) -> int:
+        return len(self._topics) - 1
+
+
+class Subscription:
+    """Iterable of SSE chunks for a WSGI response; ``close`` frees the slot."""
+
+    def __init__(self, broadcaster: Broadcaster, key: str, topic: _Topic, position: int) -> None:
+        self._broadcaster = broadcaster
+        self._key = key
+        self._topic = topic
+        self._events = broadcaster._stream(topic, position)
+        self._closed = False
+
+    def __iter__(self) -> Iterator[bytes]:
+        return self
+
+    def __next__(self) -> bytes:
+        return next(self._events)
+
+    def close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self._events.close()
+            self._broadcaster._unsubscribe(self._key, self._topic)
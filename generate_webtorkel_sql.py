@@ -1,7 +1,19 @@
 from __future__ import annotations
 
+from dataclasses import dataclass, replace
 from pathlib import Path
-from typing import Iterable, List
+from typing import Dict, List, Tuple
+import argparse
+import csv
+import hashlib
+import json
+import os
+import re
+import time
+
+from sqlalchemy import and_, create_engine
+
+from webtorkel import Base, content_version, row_hash, row_key
 
 SOURCE_DIR = Path("/home/magnus/projects/Webtorkel")
 OUT_DIR = Path("/home/magnus/projects/BinaryPacketsDSL/webtorkel_sql")
@@ -11,6 +23,23 @@ TEXT_LINES_PER_TABLE = 8
 OPTIONS_PER_TABLE = 6
 PROP_COLUMNS = 38
 
+FORMATS = ("rows", "batched", "csv", "tsv")
+PROPS_LAYOUTS = ("dense", "sparse")
+BATCH_ROWS = 500
+MANIFEST_NAME = "sync_manifest.json"
+
+# Columns rewritten by webtorkel_sql/clean_text.sql after a full import: the
+# first block joins hyphenated words and spaces out semicolons, the second
+# collapses whitespace runs and trims.
+CLEANED_COLUMNS = {
+    "table_text": ["title"] + [f"option_{i}" for i in range(1, OPTIONS_PER_TABLE + 1)],
+    "combat_texts": ["text"],
+    "info_lines": ["text"],
+}
+COLLAPSED_COLUMNS = {
+    "table_text": ["label", "title"] + [f"option_{i}" for i in range(1, OPTIONS_PER_TABLE + 1)],
+}
+
 
 def read_lines(path: Path, encoding: str) -> List[str]:
     with path.open("r", encoding=encoding, newline="") as handle:
@@ -53,6 +82,14 @@ def write_schema(out_path: Path) -> None:
             "  PRIMARY KEY (table_id, option_index)",
             ") ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_swedish_ci;",
             "",
+            "CREATE TABLE IF NOT EXISTS table_option_values (",
+            "  table_id INT NOT NULL,",
+            "  option_index INT NOT NULL,",
+            "  prop_column INT NOT NULL,",
+            "  value INT NOT NULL,",
+            "  PRIMARY KEY (table_id, option_index, prop_column)",
+            ") ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_swedish_ci;",
+            "",
             "CREATE TABLE IF NOT EXISTS opponents (",
             "  opponent_id INT NOT NULL,",
             "  correction INT NOT NULL,",
@@ -72,40 +109,48 @@ def write_schema(out_path: Path) -> None:
             "  PRIMARY KEY (line_index)",
             ") ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_swedish_ci;",
             "",
+            "CREATE TABLE IF NOT EXISTS finished_games (",
+            "  id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,",
+            "  name TEXT,",
+            "  xp INT NOT NULL,",
+            "  gold INT NOT NULL,",
+            "  rounds INT NOT NULL,",
+            "  form TEXT,",
+            "  finished_at INT NOT NULL",
+            ") ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_swedish_ci;",
+            "",
+            "CREATE INDEX IF NOT EXISTS ix_finished_games_finished_at ON finished_games (finished_at);",
+            "",
         ]
     )
     out_path.write_text("\n".join(lines), encoding="utf-8")
 
 
-def write_text_import(out_path: Path) -> None:
-    lines = read_lines(SOURCE_DIR / "text.txt", encoding="iso-8859-1")
+@dataclass
+class ImportTable:
+    name: str
+    table: str
+    columns: List[str]
+    rows: List[Tuple[object, ...]]
+    key_columns: int = 1
+
+
+def text_rows(source_dir: Path) -> ImportTable:
+    lines = read_lines(source_dir / "text.txt", encoding="iso-8859-1")
     expected = TEXT_TABLES * TEXT_LINES_PER_TABLE
     if len(lines) != expected:
         raise ValueError(f"text.txt has {len(lines)} lines, expected {expected}")
 
-    output: List[str] = ["USE webtorkel;"]
-    idx = 0
+    rows: List[Tuple[object, ...]] = []
     for table_id in range(TEXT_TABLES):
-        chunk = lines[idx : idx + TEXT_LINES_PER_TABLE]
-        idx += TEXT_LINES_PER_TABLE
-        label = chunk[0]
-        title = chunk[1]
-        options = chunk[2:8]
-        values = [
-            str(table_id),
-            sql_escape(label),
-            sql_escape(title),
-        ] + [sql_escape(value) for value in options]
-        columns = "table_id, label, title, option_1, option_2, option_3, option_4, option_5, option_6"
-        output.append(
-            f"INSERT INTO table_text ({columns}) VALUES ({', '.join(values)});"
-        )
-    output.append("")
-    out_path.write_text("\n".join(output), encoding="utf-8")
+        chunk = lines[table_id * TEXT_LINES_PER_TABLE : (table_id + 1) * TEXT_LINES_PER_TABLE]
+        rows.append((table_id, *chunk))
+    columns = ["table_id", "label", "title"] + [f"option_{i}" for i in range(1, OPTIONS_PER_TABLE + 1)]
+    return ImportTable("import_text", "table_text", columns, rows)
 
 
-def write_properties_import(out_path: Path) -> None:
-    raw_lines = read_lines(SOURCE_DIR / "egenskaper.txt", encoding="ascii")
+def properties_rows(source_dir: Path) -> ImportTable:
+    raw_lines = read_lines(source_dir / "egenskaper.txt", encoding="ascii")
     data_rows: List[List[int]] = []
     for line in raw_lines:
         if not line.strip():
@@ -123,22 +168,29 @@ def write_properties_import(out_path: Path) -> None:
             f"egenskaper.txt has {len(data_rows)} data rows, expected {expected} (tables 1-225)"
         )
 
-    output: List[str] = ["USE webtorkel;"]
-    for index, row in enumerate(data_rows):
-        table_id = (index // OPTIONS_PER_TABLE) + 1
-        option_index = (index % OPTIONS_PER_TABLE) + 1
-        columns = ["table_id", "option_index"] + [f"c{i}" for i in range(PROP_COLUMNS)]
-        values = [str(table_id), str(option_index)] + [str(value) for value in row]
-        output.append(
-            f"INSERT INTO table_option_properties ({', '.join(columns)}) VALUES ({', '.join(values)});"
-        )
-    output.append("")
-    out_path.write_text("\n".join(output), encoding="utf-8")
+    rows = [
+        ((index // OPTIONS_PER_TABLE) + 1, (index % OPTIONS_PER_TABLE) + 1, *row)
+        for index, row in enumerate(data_rows)
+    ]
+    columns = ["table_id", "option_index"] + [f"c{i}" for i in range(PROP_COLUMNS)]
+    return ImportTable("import_egenskaper", "table_option_properties", columns, rows, key_columns=2)
 
 
-def write_opponents_import(out_path: Path) -> None:
-    raw_lines = read_lines(SOURCE_DIR / "motstandare.txt", encoding="ascii")
-    data_rows: List[List[int]] = []
+def sparse_properties(data: ImportTable) -> ImportTable:
+    """Option properties as (table, option, column, value) rows, non-zero values only."""
+    rows = [
+        (table_id, option_index, column, value)
+        for table_id, option_index, *values in data.rows
+        for column, value in enumerate(values)
+        if value
+    ]
+    columns = ["table_id", "option_index", "prop_column", "value"]
+    return ImportTable(data.name, "table_option_values", columns, rows, key_columns=3)
+
+
+def opponents_rows(source_dir: Path) -> ImportTable:
+    raw_lines = read_lines(source_dir / "motstandare.txt", encoding="ascii")
+    rows: List[Tuple[object, ...]] = []
     for line in raw_lines:
         if not line.strip():
             continue
@@ -147,50 +199,322 @@ def write_opponents_import(out_path: Path) -> None:
             raise ValueError(
                 f"motstandare.txt line has {len(parts)} columns, expected 2: {line!r}"
             )
-        data_rows.append([int(value) for value in parts])
+        rows.append((len(rows), int(parts[0]), int(parts[1])))
+    return ImportTable("import_motstandare", "opponents", ["opponent_id", "correction", "xp"], rows)
+
+
+def combat_texts_rows(source_dir: Path) -> ImportTable:
+    lines = read_lines(source_dir / "stridtext.txt", encoding="iso-8859-1")
+    rows = [(combat_id, text) for combat_id, text in enumerate(lines)]
+    return ImportTable("import_stridtext", "combat_texts", ["combat_id", "text"], rows)
+
+
+def info_rows(source_dir: Path) -> ImportTable:
+    lines = read_lines(source_dir / "info.txt", encoding="utf-8")
+    rows = [(line_index, text) for line_index, text in enumerate(lines)]
+    return ImportTable("import_info", "info_lines", ["line_index", "text"], rows)
+
 
+# (table, source file, reader) for every imported table.
+IMPORTS = [
+    ("table_text", "text.txt", text_rows),
+    ("table_option_properties", "egenskaper.txt", properties_rows),
+    ("opponents", "motstandare.txt", opponents_rows),
+    ("combat_texts", "stridtext.txt", combat_texts_rows),
+    ("info_lines", "info.txt", info_rows),
+]
+
+
+def sql_value(value: object) -> str:
+    return sql_escape(value) if isinstance(value, str) else str(value)
+
+
+def write_row_inserts(out_dir: Path, data: ImportTable) -> None:
+    """One INSERT per row, committed one by one under autocommit."""
     output: List[str] = ["USE webtorkel;"]
-    for opponent_id, (correction, xp) in enumerate(data_rows):
+    columns = ", ".join(data.columns)
+    for row in data.rows:
         output.append(
-            "INSERT INTO opponents (opponent_id, correction, xp) "
-            f"VALUES ({opponent_id}, {correction}, {xp});"
+            f"INSERT INTO {data.table} ({columns}) VALUES ({', '.join(sql_value(value) for value in row)});"
         )
     output.append("")
-    out_path.write_text("\n".join(output), encoding="utf-8")
+    (out_dir / f"{data.name}.sql").write_text("\n".join(output), encoding="utf-8")
 
 
-def write_combat_texts_import(out_path: Path) -> None:
-    lines = read_lines(SOURCE_DIR / "stridtext.txt", encoding="iso-8859-1")
-    output: List[str] = ["USE webtorkel;"]
-    for combat_id, text in enumerate(lines):
-        output.append(
-            "INSERT INTO combat_texts (combat_id, text) "
-            f"VALUES ({combat_id}, {sql_escape(text)});"
+def write_batched_inserts(out_dir: Path, data: ImportTable, batch_rows: int = BATCH_ROWS) -> None:
+    """Multi-row INSERTs of up to ``batch_rows`` rows, in one transaction."""
+    output: List[str] = ["USE webtorkel;", "BEGIN;"]
+    columns = ", ".join(data.columns)
+    for start in range(0, len(data.rows), batch_rows):
+        batch = data.rows[start : start + batch_rows]
+        output.append(f"INSERT INTO {data.table} ({columns}) VALUES")
+        values = [f"({', '.join(sql_value(value) for value in row)})" for row in batch]
+        output.append(",\n".join(values) + ";")
+    output.extend(["COMMIT;", ""])
+    (out_dir / f"{data.name}.sql").write_text("\n".join(output), encoding="utf-8")
+
+
+def tsv_field(value: object) -> str:
+    # MariaDB's default LOAD DATA escaping.
+    text = str(value)
+    return text.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+def write_load_data(out_dir: Path, data: ImportTable, fmt: str) -> None:
+    """A CSV/TSV data file plus a LOAD DATA LOCAL INFILE script, run from ``out_dir``."""
+    data_name = f"{data.name}.{fmt}"
+    with (out_dir / data_name).open("w", encoding="utf-8", newline="") as handle:
+        if fmt == "csv":
+            writer = csv.writer(handle, lineterminator="\n")
+            writer.writerow(data.columns)
+            writer.writerows(data.rows)
+            fields = "FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' ESCAPED BY ''"
+        else:
+            handle.write("\t".join(data.columns) + "\n")
+            for row in data.rows:
+                handle.write("\t".join(tsv_field(value) for value in row) + "\n")
+            fields = "FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\'"
+    output = [
+        "USE webtorkel;",
+        f"LOAD DATA LOCAL INFILE '{data_name}'",
+        f"INTO TABLE {data.table}",
+        "CHARACTER SET utf8mb4",
+        fields,
+        "LINES TERMINATED BY '\\n'",
+        "IGNORE 1 LINES",
+        f"({', '.join(data.columns)});",
+        "",
+    ]
+    (out_dir / f"{data.name}.sql").write_text("\n".join(output), encoding="utf-8")
+
+
+def write_import(out_dir: Path, data: ImportTable, fmt: str = "rows", batch_rows: int = BATCH_ROWS) -> None:
+    if fmt == "rows":
+        write_row_inserts(out_dir, data)
+    elif fmt == "batched":
+        write_batched_inserts(out_dir, data, batch_rows)
+    elif fmt in ("csv", "tsv"):
+        write_load_data(out_dir, data, fmt)
+    else:
+        raise ValueError(f"unknown format: {fmt!r}")
+
+
+def clean_text(value: str) -> str:
+    value = re.sub(r"-\s+", "", value, flags=re.ASCII)
+    return re.sub(r";(\S)", r"; \1", value, flags=re.ASCII)
+
+
+def collapse_spaces(value: str) -> str:
+    # TRIM only strips spaces, but no other whitespace is left after the collapse.
+    return re.sub(r"\s+", " ", value, flags=re.ASCII).strip(" ")
+
+
+def _rewrite(data: ImportTable, columns: List[str], rewrite) -> ImportTable:
+    positions = {data.columns.index(column) for column in columns}
+    rows = [
+        tuple(rewrite(value) if index in positions else value for index, value in enumerate(row))
+        for row in data.rows
+    ]
+    return replace(data, rows=rows)
+
+
+def cleaned(data: ImportTable) -> ImportTable:
+    """``data`` as it reads after both blocks of clean_text.sql have run."""
+    if data.table in CLEANED_COLUMNS:
+        data = _rewrite(data, CLEANED_COLUMNS[data.table], clean_text)
+    if data.table in COLLAPSED_COLUMNS:
+        data = _rewrite(data, COLLAPSED_COLUMNS[data.table], collapse_spaces)
+    return data
+
+
+@dataclass
+class SyncResult:
+    version: str
+    upserted: Dict[str, int]
+    deleted: Dict[str, int]
+    seconds: float
+
+
+def load_manifest(path: Path) -> Dict[str, Dict[str, object]]:
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def save_manifest(path: Path, manifest: Dict[str, object]) -> None:
+    partial = path.with_name(path.name + ".tmp")
+    partial.write_text(json.dumps(manifest), encoding="utf-8")
+    os.replace(partial, path)
+
+
+def upsert_statement(dialect: str, table, key_names: List[str]):
+    other = [column.name for column in table.columns if column.name not in key_names]
+    if dialect in ("mysql", "mariadb"):
+        from sqlalchemy.dialects.mysql import insert
+
+        statement = insert(table)
+        return statement.on_duplicate_key_update({name: statement.inserted[name] for name in other})
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+
+        statement = insert(table)
+        return statement.on_conflict_do_update(
+            index_elements=key_names,
+            set_={name: statement.excluded[name] for name in other},
         )
-    output.append("")
-    out_path.write_text("\n".join(output), encoding="utf-8")
+    raise ValueError(f"--sync does not support the {dialect} dialect")
 
 
-def write_info_import(out_path: Path) -> None:
-    lines = read_lines(SOURCE_DIR / "info.txt", encoding="utf-8")
-    output: List[str] = ["USE webtorkel;"]
-    for line_index, text in enumerate(lines):
-        output.append(
-            "INSERT INTO info_lines (line_index, text) "
-            f"VALUES ({line_index}, {sql_escape(text)});"
+def apply_sparse_properties(connection, changed: List[Dict[str, object]], removed: List[Tuple[int, ...]]) -> None:
+    table = Base.metadata.tables["table_option_values"]
+    for table_id, option_index in removed + [(row["table_id"], row["option_index"]) for row in changed]:
+        connection.execute(table.delete().where(table.c.table_id == table_id, table.c.option_index == option_index))
+    values = [
+        {
+            "table_id": row["table_id"],
+            "option_index": row["option_index"],
+            "prop_column": column,
+            "value": row[f"c{column}"],
+        }
+        for row in changed
+        for column in range(PROP_COLUMNS)
+        if row[f"c{column}"]
+    ]
+    if values:
+        connection.execute(table.insert(), values)
+
+
+def sync(
+    db_url: str,
+    source_dir: Path,
+    manifest_path: Path,
+    clean: bool = False,
+    props_layout: str = "dense",
+) -> SyncResult:
+    """Apply source rows whose hash differs from the manifest as upserts, in one transaction.
+
+    Rows listed in the manifest but gone from the source are deleted. Source
+    files whose digest matches the manifest are not parsed at all. Without a
+    manifest every row is upserted, which also creates it. The manifest
+    records ``clean`` and ``props_layout``; if either changed, it counts as no
+    manifest, and the properties table of a new layout is emptied first.
+    Option properties are compared per (table, option) in either layout;
+    all-zero rows count as absent, as they do for DataStore.
+    """
+    start = time.perf_counter()
+    manifest = load_manifest(manifest_path)
+    settings = {"clean": clean, "props_layout": props_layout}
+    relayout = False
+    if manifest.get("settings") != settings:
+        relayout = bool(manifest) and manifest.get("settings", {}).get("props_layout") != props_layout
+        manifest = {}
+    old_files = manifest.get("files", {})
+    old_rows = manifest.get("rows", {})
+
+    files: Dict[str, str] = {}
+    hashes: Dict[str, Dict[str, str]] = {}
+    changes: List[Tuple[ImportTable, List[Dict[str, object]], List[Tuple[int, ...]]]] = []
+    for table, source, read_rows in IMPORTS:
+        files[table] = hashlib.sha1((source_dir / source).read_bytes()).hexdigest()
+        old = old_rows.get(table, {})
+        if files[table] == old_files.get(table) and old:
+            hashes[table] = old
+            continue
+
+        data = read_rows(source_dir)
+        if clean:
+            data = cleaned(data)
+        rows = data.rows
+        if table == "table_option_properties":
+            rows = [row for row in rows if any(row[2:])]
+        new = hashes[table] = {}
+        changed: List[Dict[str, object]] = []
+        for row in rows:
+            key = row_key(row[: data.key_columns])
+            new[key] = row_digest = row_hash(row)
+            if old.get(key) != row_digest:
+                changed.append(dict(zip(data.columns, row)))
+        removed = [tuple(int(part) for part in key.split(":")) for key in old if key not in new]
+        if changed or removed:
+            changes.append((data, changed, removed))
+
+    result = SyncResult(content_version(hashes), {}, {}, 0.0)
+    if changes:
+        engine = create_engine(db_url, future=True)
+        with engine.begin() as connection:
+            for data, changed, removed in changes:
+                result.upserted[data.table] = len(changed)
+                result.deleted[data.table] = len(removed)
+                if data.table == "table_option_properties" and relayout:
+                    target = "table_option_values" if props_layout == "sparse" else data.table
+                    connection.execute(Base.metadata.tables[target].delete())
+                if data.table == "table_option_properties" and props_layout == "sparse":
+                    apply_sparse_properties(connection, changed, removed)
+                    continue
+                table = Base.metadata.tables[data.table]
+                key_names = data.columns[: data.key_columns]
+                if changed:
+                    connection.execute(upsert_statement(engine.dialect.name, table, key_names), changed)
+                for key in removed:
+                    connection.execute(
+                        table.delete().where(and_(*(table.c[name] == value for name, value in zip(key_names, key))))
+                    )
+        engine.dispose()
+    if changes or files != old_files:
+        save_manifest(
+            manifest_path, {"version": result.version, "settings": settings, "files": files, "rows": hashes}
         )
-    output.append("")
-    out_path.write_text("\n".join(output), encoding="utf-8")
+    result.seconds = time.perf_counter() - start
+    return result
 
 
 def main() -> None:
-    OUT_DIR.mkdir(parents=True, exist_ok=True)
-    write_schema(OUT_DIR / "schema.sql")
-    write_text_import(OUT_DIR / "import_text.sql")
-    write_properties_import(OUT_DIR / "import_egenskaper.sql")
-    write_opponents_import(OUT_DIR / "import_motstandare.sql")
-    write_combat_texts_import(OUT_DIR / "import_stridtext.sql")
-    write_info_import(OUT_DIR / "import_info.sql")
+    parser = argparse.ArgumentParser(description="Generate the webtorkel schema and import files.")
+    parser.add_argument("--source", type=Path, default=SOURCE_DIR, help="directory with the original .txt files")
+    parser.add_argument("--out", type=Path, default=OUT_DIR)
+    parser.add_argument(
+        "--format",
+        choices=FORMATS,
+        default="rows",
+        help="rows: one INSERT per row; batched: multi-row INSERTs in one transaction; "
+        "csv/tsv: data files plus LOAD DATA LOCAL INFILE scripts",
+    )
+    parser.add_argument("--batch-rows", type=int, default=BATCH_ROWS)
+    parser.add_argument(
+        "--props-layout",
+        choices=PROPS_LAYOUTS,
+        default="dense",
+        help="dense: 38 columns per option in table_option_properties; "
+        "sparse: non-zero (column, value) rows in table_option_values",
+    )
+    parser.add_argument(
+        "--sync",
+        metavar="DB_URL",
+        help="instead of writing files, upsert the rows that changed since the last sync into DB_URL",
+    )
+    parser.add_argument("--manifest", type=Path, help=f"sync manifest (default: OUT/{MANIFEST_NAME})")
+    parser.add_argument("--clean", action="store_true", help="apply the clean_text.sql rewrites to synced rows")
+    args = parser.parse_args()
+
+    if args.sync:
+        manifest = args.manifest or args.out / MANIFEST_NAME
+        manifest.parent.mkdir(parents=True, exist_ok=True)
+        result = sync(args.sync, args.source, manifest, clean=args.clean, props_layout=args.props_layout)
+        for table, count in result.upserted.items():
+            print(f"{table}: {count} upserted, {result.deleted[table]} deleted")
+        print(f"content version {result.version} ({result.seconds * 1000:.1f} ms)")
+        return
+
+    args.out.mkdir(parents=True, exist_ok=True)
+    write_schema(args.out / "schema.sql")
+    for table, _source, read_rows in IMPORTS:
+        data = read_rows(args.source)
+        if table == "table_option_properties" and args.props_layout == "sparse":
+            data = sparse_properties(data)
+        write_import(args.out, data, args.format, args.batch_rows)
 
 
 if __name__ == "__main__":
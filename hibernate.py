@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+import os
+import pickle
+import tempfile
+import threading
+import time
+import zlib
+
+SUFFIX = ".game.z"
+COMPRESS_LEVEL = 1
+
+
+class HibernationStore:
+    """Idle games pickled and zlib-compressed into one file per game id.
+
+    Files are only ever read back by this process, but they are unpickled, so
+    the directory must not be writable by anyone else. ``save`` can name other
+    files the state owns (a game log's spill file); ``discard`` deletes them
+    with the game, so dropping a game never needs to unpickle it.
+    """
+
+    def __init__(self, directory: Optional[str] = None) -> None:
+        if directory:
+            self.directory = Path(directory)
+            self.directory.mkdir(parents=True, exist_ok=True)
+        else:
+            self.directory = Path(tempfile.mkdtemp(prefix="webtorkel-hibernate-"))
+        self._lock = threading.Lock()
+        self._sizes: Dict[str, int] = {}
+        self._owned: Dict[str, List[Path]] = {}
+        for path in self.directory.glob("*" + SUFFIX):
+            self._sizes[path.name[: -len(SUFFIX)]] = path.stat().st_size
+
+    def __contains__(self, game_id: str) -> bool:
+        return game_id in self._sizes
+
+    def __len__(self) -> int:
+        return len(self._sizes)
+
+    def total_bytes(self) -> int:
+        return sum(self._sizes.values())
+
+    def _path(self, game_id: str) -> Path:
+        # Game ids are uuid4 hex strings; anything else never reaches the disk.
+        if not game_id.isalnum():
+            raise ValueError(f"invalid game id: {game_id!r}")
+        return self.directory / (game_id + SUFFIX)
+
+    def save(self, game_id: str, state: object, owned: Iterable[Path] = ()) -> int:
+        data = zlib.compress(pickle.dumps(state, pickle.HIGHEST_PROTOCOL), COMPRESS_LEVEL)
+        path = self._path(game_id)
+        partial = path.with_name(path.name + ".tmp")
+        partial.write_bytes(data)
+        os.replace(partial, path)
+        with self._lock:
+            self._sizes[game_id] = len(data)
+            self._owned[game_id] = list(owned)
+        return len(data)
+
+    def load(self, game_id: str) -> Optional[object]:
+        """Read and remove a hibernated game; None if it is not on disk."""
+        with self._lock:
+            self._owned.pop(game_id, None)
+            if self._sizes.pop(game_id, None) is None:
+                return None
+        path = self._path(game_id)
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            return None
+        path.unlink(missing_ok=True)
+        return pickle.loads(zlib.decompress(data))
+
+    def discard(self, game_id: str) -> bool:
+        with self._lock:
+            owned = self._owned.pop(game_id, [])
+            if self._sizes.pop(game_id, None) is None:
+                return False
+        self._path(game_id).unlink(missing_ok=True)
+        for path in owned:
+            path.unlink(missing_ok=True)
+        return True
+
+    def expired(self, max_age: float) -> List[str]:
+        """Ids of games hibernated more than ``max_age`` seconds ago."""
+        cutoff = time.time() - max_age
+        stale = []
+        for game_id in list(self._sizes):
+            try:
+                if self._path(game_id).stat().st_mtime < cutoff:
+                    stale.append(game_id)
+            except FileNotFoundError:
+                stale.append(game_id)
+        return stale
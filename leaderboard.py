@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional, Tuple
+import heapq
+import itertools
+import logging
+import queue
+import threading
+import time
+
+from sqlalchemy import insert, select
+
+from webtorkel import FinishedGame
+
+log = logging.getLogger(__name__)
+
+RANKINGS = ("xp", "gold")
+DAY_SECONDS = 24 * 60 * 60
+
+
+@dataclass
+class LeaderboardEntry:
+    name: str
+    xp: int
+    gold: int
+    rounds: int
+    form: str
+    finished_at: int
+
+
+def day_of(timestamp: float) -> str:
+    return time.strftime("%Y-%m-%d", time.gmtime(timestamp))
+
+
+class TopN:
+    """The ``size`` highest entries by one field, kept in a min-heap."""
+
+    def __init__(self, size: int, field: str) -> None:
+        self.size = size
+        self.field = field
+        self._heap: List[Tuple[int, int, LeaderboardEntry]] = []
+        # Ties go to the earlier game: later entries get a lower sequence number.
+        self._order = itertools.count(0, -1)
+
+    def add(self, entry: LeaderboardEntry) -> bool:
+        item = (getattr(entry, self.field), next(self._order), entry)
+        if len(self._heap) < self.size:
+            heapq.heappush(self._heap, item)
+            return True
+        if item > self._heap[0]:
+            heapq.heapreplace(self._heap, item)
+            return True
+        return False
+
+    def entries(self) -> List[LeaderboardEntry]:
+        return [entry for _value, _order, entry in sorted(self._heap, reverse=True)]
+
+
+class Leaderboard:
+    """Top finished games by XP and by gold, overall and per UTC day."""
+
+    def __init__(self, size: int = 10, days: int = 7) -> None:
+        self.size = size
+        self.days = days
+        self._lock = threading.Lock()
+        self._overall = self._rankings()
+        self._daily: Dict[str, Dict[str, TopN]] = {}
+
+    def _rankings(self) -> Dict[str, TopN]:
+        return {field: TopN(self.size, field) for field in RANKINGS}
+
+    def add(self, entry: LeaderboardEntry) -> None:
+        day = day_of(entry.finished_at)
+        with self._lock:
+            for ranking in self._overall.values():
+                ranking.add(entry)
+            daily = self._daily.get(day)
+            if daily is None:
+                daily = self._daily[day] = self._rankings()
+                for old_day in sorted(self._daily)[: -self.days]:
+                    del self._daily[old_day]
+            for ranking in daily.values():
+                ranking.add(entry)
+
+    def top(self, field: str, day: Optional[str] = None) -> List[LeaderboardEntry]:
+        with self._lock:
+            rankings = self._overall if day is None else self._daily.get(day)
+            if rankings is None or field not in rankings:
+                return []
+            return rankings[field].entries()
+
+    def recent_days(self) -> List[str]:
+        with self._lock:
+            return sorted(self._daily, reverse=True)
+
+    def load(self, session, now: Optional[float] = None) -> int:
+        """Seed the index from finished_games: overall and for the last ``days`` days.
+
+        Each window only fills its own rankings, so a day's rankings hold that
+        day's best games rather than whichever of them made the overall top.
+        """
+        now = time.time() if now is None else now
+        windows: List[Tuple[Optional[int], Optional[int]]] = [(None, None)]
+        today = int(now) - int(now) % DAY_SECONDS
+        for offset in range(self.days):
+            start = today - offset * DAY_SECONDS
+            windows.append((start, start + DAY_SECONDS))
+
+        seen = set()
+        for start, end in windows:
+            entries: Dict[int, LeaderboardEntry] = {}
+            for field in RANKINGS:
+                query = select(FinishedGame).order_by(getattr(FinishedGame, field).desc()).limit(self.size)
+                if start is not None:
+                    query = query.where(FinishedGame.finished_at >= start, FinishedGame.finished_at < end)
+                for row in session.scalars(query):
+                    entries[row.id] = LeaderboardEntry(
+                        name=row.name or "",
+                        xp=row.xp,
+                        gold=row.gold,
+                        rounds=row.rounds,
+                        form=row.form or "",
+                        finished_at=row.finished_at,
+                    )
+            if not entries:
+                continue
+            seen.update(entries)
+            with self._lock:
+                if start is None:
+                    rankings = self._overall
+                else:
+                    rankings = self._daily.setdefault(day_of(start), self._rankings())
+                for entry in entries.values():
+                    for ranking in rankings.values():
+                        ranking.add(entry)
+        return len(seen)
+
+
+class ResultWriter:
+    """Write-behind queue that inserts finished games in batches.
+
+    ``submit`` never touches the database. A background thread collects up to
+    ``batch_size`` entries, or whatever arrived within ``flush_seconds`` of the
+    first one, and inserts them in one transaction. Failed batches are retried
+    with backoff up to ``max_attempts`` times and then dropped, so one bad batch
+    cannot stall the queue; entries submitted while the queue is full are
+    dropped too.
+    """
+
+    def __init__(
+        self,
+        session_factory,
+        batch_size: int = 200,
+        flush_seconds: float = 1.0,
+        max_pending: int = 10000,
+        max_attempts: int = 5,
+    ) -> None:
+        self.session_factory = session_factory
+        self.batch_size = max(1, batch_size)
+        self.flush_seconds = flush_seconds
+        self.max_attempts = max(1, max_attempts)
+        self._queue: "queue.Queue[LeaderboardEntry]" = queue.Queue(maxsize=max_pending)
+        self._thread: Optional[threading.Thread] = None
+        self.written = 0
+        self.batches = 0
+        self.failures = 0
+        self.dropped = 0
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def submit(self, entry: LeaderboardEntry) -> bool:
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+            return False
+        return True
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="webtorkel-result-writer", daemon=True)
+            self._thread.start()
+
+    def flush(self) -> None:
+        """Block until every submitted entry has been written."""
+        self._queue.join()
+
+    def _next_batch(self) -> List[LeaderboardEntry]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.flush_seconds
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            delay = 1.0
+            for attempt in range(1, self.max_attempts + 1):
+                try:
+                    self._write(batch)
+                except Exception:
+                    self.failures += 1
+                    log.exception(
+                        "writing %d finished games failed (attempt %d of %d)", len(batch), attempt, self.max_attempts
+                    )
+                    if attempt < self.max_attempts:
+                        time.sleep(delay)
+                        delay = min(delay * 2, 60.0)
+                    continue
+                self.written += len(batch)
+                self.batches += 1
+                break
+            else:
+                log.error("dropping %d finished games after %d failed attempts", len(batch), self.max_attempts)
+                self.dropped += len(batch)
+            for _entry in batch:
+                self._queue.task_done()
+
+    def _write(self, batch: List[LeaderboardEntry]) -> None:
+        with self.session_factory() as session, session.begin():
+            session.execute(insert(FinishedGame), [asdict(entry) for entry in batch])
@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Tuple
+import sys
+import threading
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+# Shard count at which shards of finished threads are folded into the retired one.
+PRUNE_SHARDS = 64
+
+Labels = Tuple[Tuple[str, str], ...]
+Key = Tuple[str, Labels]
+
+
+class _Shard:
+    __slots__ = ("counters", "histograms")
+
+    def __init__(self) -> None:
+        self.counters: Dict[Key, float] = {}
+        self.histograms: Dict[Key, List[float]] = {}
+
+
+class Registry:
+    """Counters and histograms written to per-thread shards.
+
+    Shards are keyed by thread id, so the hot path is one dict lookup and takes
+    no lock. The ids of finished threads are reused by new ones (Werkzeug's
+    threaded server starts a thread per request), and a new thread simply
+    continues the shard of the finished one. Only when a thread id is new does
+    recording take the lock; if the map has grown, shards of ids that no longer
+    belong to a running thread are then folded into a retired shard.
+    """
+
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS) -> None:
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._shards: Dict[int, _Shard] = {}
+        self._prune_at = PRUNE_SHARDS
+        self._retired = _Shard()
+        self._help: Dict[str, Tuple[str, str]] = {}
+        self._gauges: List[Tuple[str, Callable[[], Iterable[Tuple[Labels, float]]]]] = []
+
+    def describe(self, name: str, kind: str, text: str) -> None:
+        self._help[name] = (kind, text)
+
+    def gauge(self, name: str, text: str, collect: Callable[[], Iterable[Tuple[Labels, float]]]) -> None:
+        self.describe(name, "gauge", text)
+        self._gauges.append((name, collect))
+
+    def counter(self, name: str, text: str, collect: Callable[[], Iterable[Tuple[Labels, float]]]) -> None:
+        """Like ``gauge``, for a count that only grows and is kept outside the registry."""
+        self.describe(name, "counter", text)
+        self._gauges.append((name, collect))
+
+    def _shard(self) -> _Shard:
+        shard = self._shards.get(threading.get_ident())
+        if shard is None:
+            shard = self._add_shard()
+        return shard
+
+    def _add_shard(self) -> _Shard:
+        ident = threading.get_ident()
+        with self._lock:
+            if len(self._shards) >= self._prune_at:
+                running = {thread.ident for thread in threading.enumerate()}
+                for stale in [key for key in self._shards if key not in running]:
+                    _merge(self._retired, self._shards.pop(stale))
+                self._prune_at = max(PRUNE_SHARDS, 2 * len(self._shards))
+            shard = self._shards.setdefault(ident, _Shard())
+        return shard
+
+    def inc(self, name: str, amount: float = 1, labels: Labels = ()) -> None:
+        counters = self._shard().counters
+        key = (name, labels)
+        counters[key] = counters.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, labels: Labels = ()) -> None:
+        histograms = self._shard().histograms
+        key = (name, labels)
+        values = histograms.get(key)
+        if values is None:
+            # One slot per bucket plus +Inf, then the running sum.
+            values = histograms[key] = [0.0] * (len(self.buckets) + 2)
+        values[bisect_left(self.buckets, value)] += 1
+        values[-1] += value
+
+    def snapshot(self) -> _Shard:
+        total = _Shard()
+        with self._lock:
+            _merge(total, self._retired)
+            for shard in self._shards.values():
+                _merge(total, shard)
+        return total
+
+    def render(self) -> str:
+        total = self.snapshot()
+        lines: List[str] = []
+        seen = set()
+
+        def header(name: str) -> None:
+            if name in seen or name not in self._help:
+                return
+            seen.add(name)
+            kind, text = self._help[name]
+            lines.append(f"# HELP {name} {text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in sorted(total.counters.items()):
+            header(name)
+            lines.append(f"{name}{_labels(labels)} {_number(value)}")
+
+        for (name, labels), values in sorted(total.histograms.items()):
+            header(name)
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (float("inf"),), values):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{name}_bucket{_labels(labels + (('le', le),))} {_number(cumulative)}")
+            lines.append(f"{name}_sum{_labels(labels)} {values[-1]!r}")
+            lines.append(f"{name}_count{_labels(labels)} {_number(cumulative)}")
+
+        for name, collect in self._gauges:
+            header(name)
+            for labels, value in collect():
+                lines.append(f"{name}{_labels(labels)} {_number(value)}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _merge(target: _Shard, source: _Shard) -> None:
+    for key, value in list(source.counters.items()):
+        target.counters[key] = target.counters.get(key, 0) + value
+    for key, values in list(source.histograms.items()):
+        existing = target.histograms.get(key)
+        if existing is None:
+            target.histograms[key] = list(values)
+        else:
+            for index, value in enumerate(values):
+                existing[index] += value
+
+
+def _labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    parts = []
+    for key, value in labels:
+        escaped = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{key}="{escaped}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _number(value: float) -> str:
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def deep_sizeof(obj: object, shared: object = None) -> int:
+    """Approximate retained size of an object graph (containers, dataclasses, slots).
+
+    Objects also reachable from ``shared`` are not counted.
+    """
+    seen = set()
+    if shared is not None:
+        _walk(shared, seen)
+    return _walk(obj, seen)
+
+
+def _walk(obj: object, seen: set) -> int:
+    stack = [obj]
+    total = 0
+    while stack:
+        current = stack.pop()
+        if id(current) in seen:
+            continue
+        seen.add(id(current))
+        total += sys.getsizeof(current)
+        if isinstance(current, dict):
+            stack.extend(current.keys())
+            stack.extend(current.values())
+        elif isinstance(current, (list, tuple, set, frozenset)):
+            stack.extend(current)
+        elif hasattr(current, "__dict__"):
+            stack.append(vars(current))
+        elif hasattr(current, "__slots__"):
+            stack.extend(getattr(current, slot) for slot in current.__slots__ if hasattr(current, slot))
+    return total
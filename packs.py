@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+import re
+import time
+
+from webtorkel import TABLE_COUNT, DataStore, StringPool, row_hash
+
+DEFAULT_PACK = "default"
+PACK_NAME = re.compile(r"^[A-Za-z0-9_-]{1,32}$")
+
+
+def parse_packs(spec: str, default_url: str) -> Dict[str, str]:
+    """Pack name -> database URL from ``name=url`` pairs separated by commas.
+
+    The ``default`` pack is ``default_url`` unless ``spec`` names it itself.
+    """
+    packs = {DEFAULT_PACK: default_url}
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        name, _, url = item.partition("=")
+        name = name.strip()
+        if not PACK_NAME.match(name) or not url.strip():
+            raise ValueError(f"content packs are name=url pairs, got {item!r}")
+        packs[name] = url.strip()
+    return packs
+
+
+@dataclass
+class ContentPack:
+    name: str
+    data: DataStore
+    variants: Dict[int, DataStore]
+    load_seconds: float
+
+
+class ContentRegistry:
+    """Content packs (adventures or translations) served by one process.
+
+    All packs are loaded through one StringPool, so a text that appears in
+    several packs or variants is stored once. Table entries, option
+    properties, opponents, combat texts and info lines that are identical in
+    several packs (typically translations of one adventure) are shared too.
+    Every pack's variants are copy-on-write clones of its base store.
+    """
+
+    def __init__(self, props_layout: Optional[str] = None) -> None:
+        self.props_layout = props_layout
+        self.strings = StringPool()
+        self._packs: Dict[str, ContentPack] = {}
+        # Content shared between packs, keyed by kind and row hash.
+        self._shared: Dict[str, object] = {}
+
+    def load(self, name: str, session) -> ContentPack:
+        start = time.perf_counter()
+        data = DataStore(session, self.props_layout, self.strings)
+        return self.add(name, data, time.perf_counter() - start)
+
+    def add(self, name: str, data: DataStore, load_seconds: float = 0.0) -> ContentPack:
+        if not PACK_NAME.match(name):
+            raise ValueError(f"invalid content pack name: {name!r}")
+        highest = max(data.tables, default=0)
+        if highest >= TABLE_COUNT:
+            # Table 226 is the random encounter table and games track visits in
+            # a bitmap of TABLE_COUNT + 1 bits, so larger adventures do not fit.
+            raise ValueError(f"content pack {name!r} has table {highest}; tables must be below {TABLE_COUNT}")
+        data.pack = name
+        # Nothing modifies these in place (DataStore replaces changed table
+        # entries and copies properties on write), so packs can share them.
+        data.tables = {
+            table_id: self._share(f"table:{row_hash((table_id, entry.label, entry.title, *entry.options))}", entry)
+            for table_id, entry in data.tables.items()
+        }
+        data.option_props = self._share(f"props:{data.option_props.digest()}", data.option_props).copy()
+        data.opponents = self._share(f"opponents:{row_hash(tuple(data.opponents.items()))}", data.opponents)
+        data.combat_texts = self._share(f"combat:{row_hash(tuple(data.combat_texts.items()))}", data.combat_texts)
+        data.info_lines = self._share(f"info:{row_hash(tuple(data.info_lines))}", data.info_lines)
+        pack = ContentPack(name=name, data=data, variants=data.variants(), load_seconds=load_seconds)
+        self._packs[name] = pack
+        return pack
+
+    def _share(self, key: str, value):
+        return self._shared.setdefault(key, value)
+
+    def get(self, name: Optional[str]) -> Optional[ContentPack]:
+        return self._packs.get(name) if name else None
+
+    def names(self) -> List[str]:
+        return list(self._packs)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._packs
+
+    def __len__(self) -> int:
+        return len(self._packs)
+
+    def shared_objects(self) -> int:
+        return len(self._shared)
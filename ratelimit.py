@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+from typing import Dict, Optional, Tuple
+import threading
+import time
+
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, updated: float) -> None:
+        self.tokens = tokens
+        self.updated = updated
+
+
+class RateLimiter:
+    """Token buckets refilled at ``rate`` per second up to ``burst``, one per key.
+
+    ``check`` returns 0 when a request may proceed, otherwise the number of
+    seconds until a token is available. A rate of 0 disables the limiter.
+    Once more than ``max_keys`` buckets exist, buckets that have refilled
+    completely are dropped, since a new bucket starts out full anyway.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None, max_keys: int = 100000) -> None:
+        self.rate = rate
+        self.burst = max(1.0, burst if burst is not None else rate)
+        self.max_keys = max_keys
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def check(self, key: str = "", cost: float = 1.0) -> float:
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            bucket = self._bucket(key)
+            if bucket.tokens >= cost:
+                bucket.tokens -= cost
+                return 0.0
+            return (cost - bucket.tokens) / self.rate
+
+    def take(self, key: str, wanted: int) -> Tuple[int, float]:
+        """Take up to ``wanted`` whole tokens.
+
+        Returns the number taken and 0, or 0 and the seconds until one token
+        is available.
+        """
+        if self.rate <= 0:
+            return wanted, 0.0
+        with self._lock:
+            bucket = self._bucket(key)
+            granted = min(wanted, int(bucket.tokens))
+            if granted < 1:
+                return 0, (1 - bucket.tokens) / self.rate
+            bucket.tokens -= granted
+            return granted, 0.0
+
+    def _bucket(self, key: str) -> TokenBucket:
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_keys:
+                self._prune(now)
+            bucket = self._buckets[key] = TokenBucket(self.burst, now)
+        else:
+            bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated) * self.rate)
+            bucket.updated = now
+        return bucket
+
+    def _prune(self, now: float) -> None:
+        full = [
+            key
+            for key, bucket in self._buckets.items()
+            if bucket.tokens + (now - bucket.updated) * self.rate >= self.burst
+        ]
+        for key in full:
+            del self._buckets[key]
+        if len(self._buckets) >= self.max_keys:
+            # Everyone is active: forget the oldest half rather than grow.
+            oldest = sorted(self._buckets, key=lambda key: self._buckets[key].updated)
+            for key in oldest[: len(oldest) // 2]:
+                del self._buckets[key]
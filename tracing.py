@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+from typing import Dict
+import atexit
+import json
+import threading
+import time
+
+
+class Stage:
+    __slots__ = ("trace", "name", "start")
+
+    def __init__(self, trace: "Trace", name: str) -> None:
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self) -> "Stage":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *_exc) -> None:
+        self.trace.add(self.name, time.perf_counter() - self.start)
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullStage":
+        return self
+
+    def __exit__(self, *_exc) -> None:
+        return None
+
+
+NULL_STAGE = _NullStage()
+
+
+class Trace:
+    """Stage durations of one request; a stage entered twice is summed."""
+
+    __slots__ = ("sampled", "stages", "game_id", "game")
+
+    def __init__(self, sampled: bool) -> None:
+        self.sampled = sampled
+        self.stages: Dict[str, float] = {}
+        self.game_id = ""
+        self.game = None
+
+    def stage(self, name: str) -> Stage:
+        return Stage(self, name)
+
+    def add(self, name: str, seconds: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def server_timing(self, total: float) -> str:
+        parts = [f"{name};dur={seconds * 1000:.3f}" for name, seconds in self.stages.items()]
+        parts.append(f"total;dur={total * 1000:.3f}")
+        return ", ".join(parts)
+
+
+class TraceSink:
+    """Appends one JSON line per sampled request to ``path``.
+
+    Lines are buffered and reach the file in blocks of ``buffer_bytes`` and on
+    ``close``, which also runs at interpreter exit.
+    """
+
+    def __init__(self, path: str, buffer_bytes: int = 64 * 1024) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._handle = open(path, "a", encoding="utf-8", buffering=buffer_bytes)
+        self.written = 0
+        atexit.register(self.close)
+
+    def write(self, record: Dict[str, object]) -> None:
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        with self._lock:
+            if self._handle.closed:
+                return
+            self._handle.write(line)
+            self.written += 1
+
+    def close(self) -> None:
+        with self._lock:
+            self._handle.close()
@@ -58,6 +58,14 @@ CREATE TABLE IF NOT EXISTS table_option_properties (
   PRIMARY KEY (table_id, option_index)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_swedish_ci;
 
+CREATE TABLE IF NOT EXISTS table_option_values (
+  table_id INT NOT NULL,
+  option_index INT NOT NULL,
+  prop_column INT NOT NULL,
+  value INT NOT NULL,
+  PRIMARY KEY (table_id, option_index, prop_column)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_swedish_ci;
+
 CREATE TABLE IF NOT EXISTS opponents (
   opponent_id INT NOT NULL,
   correction INT NOT NULL,
@@ -76,3 +84,15 @@ CREATE TABLE IF NOT EXISTS info_lines (
   text TEXT,
   PRIMARY KEY (line_index)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_swedish_ci;
+
+CREATE TABLE IF NOT EXISTS finished_games (
+  id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+  name TEXT,
+  xp INT NOT NULL,
+  gold INT NOT NULL,
+  rounds INT NOT NULL,
+  form TEXT,
+  finished_at INT NOT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_swedish_ci;
+
+CREATE INDEX IF NOT EXISTS ix_finished_games_finished_at ON finished_games (finished_at);